@@ -0,0 +1,177 @@
+"""Time every P&L stage on synthetic workbooks of growing size.
+
+    python -m benchmarks.bench_pnl                          # today, small, medium
+    python -m benchmarks.bench_pnl --scales large --no-xlsx   # engine/render only
+    python -m benchmarks.bench_pnl --output new.json --compare old.json
+    python -m benchmarks.bench_pnl --workers auto            # parse sheets in a process pool
+    python -m benchmarks.bench_pnl --years 5                 # five fiscal years instead of two
+
+Workbooks are generated once per scale into --workdir and reused. Each repeat loads
+the workbook, builds every fiscal-year cube and renders all 13 month views (table HTML
+and figures), timing the stages through profitability_diagnostics. The report keeps
+the median and minimum per stage so runs on the same machine are comparable.
+Parsing the 'large' xlsx takes many minutes; --no-xlsx builds the parsed frames
+in memory and skips the load/snapshot stages.
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic_workbook import FISCAL_YEARS, SCALES, build_raw_sheets, ensure_workbook, fiscal_years_back, parsed_sheets
+from profitability_diagnostics import frame_size, recording, span
+from profitability_engine import ALL_MONTHS, MONTHS, build_cubes
+from profitability_loader import PARSE_WORKERS_ENV, load_sheets, parallel_min_bytes, parse_workers
+from profitability_render import domain_figures, highlight_key_rows
+from profitability_snapshot import load_snapshot, snapshot_dir
+
+DEFAULT_WORKDIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".workbooks")
+VIEWS = [ALL_MONTHS] + MONTHS
+
+# Report order; engine stage names match the dashboard's diagnostics spans
+STAGES = ["load", "snapshot_rebuild", "snapshot_load", "sales", "deferred_revenue", "purchases",
+          "salary", "expenses", "tns", "net_profit", "html_table", "plotly"]
+
+
+def run_once(path, sheets=None):
+    # One full pass; `sheets` skips the xlsx stages (the --no-xlsx mode)
+    with recording() as recorder:
+        if sheets is None:
+            with span("load", nbytes=os.path.getsize(path)) as stage:
+                sheets = load_sheets(path)
+                stage["rows"] = sum(len(df) for df in sheets.values())
+            shutil.rmtree(snapshot_dir(path), ignore_errors=True)
+            with span("snapshot_rebuild", nbytes=os.path.getsize(path)):
+                load_snapshot(path)
+            with span("snapshot_load") as stage:
+                snap = load_snapshot(path)
+                stage["rows"], stage["bytes"] = map(sum, zip(*(frame_size(df) for df in snap.values())))
+        cubes = build_cubes(sheets)
+        for fy, cube in cubes.items():
+            for month in VIEWS:
+                pnl = cube.pnl(month)
+                with span("html_table", rows=len(pnl), fy=fy):
+                    highlight_key_rows(pnl)
+                with span("plotly", rows=len(pnl.columns), fy=fy):
+                    domain_figures(pnl, f"FY {fy}" if month == ALL_MONTHS else month)
+    return recorder.spans
+
+
+def summarize(runs):
+    # Per stage: sum the spans of one run (every FY, all views), then median/min over runs
+    per_run = []
+    for spans in runs:
+        totals = {}
+        for s in spans:
+            t = totals.setdefault(s["stage"], {"ms": 0.0, "rows": 0, "bytes": 0})
+            t["ms"] += s["ms"]
+            t["rows"] += s["rows"]
+            t["bytes"] += s["bytes"]
+        per_run.append(totals)
+    out = {}
+    for stage in STAGES:
+        samples = [r[stage] for r in per_run if stage in r]
+        if samples:
+            ms = [x["ms"] for x in samples]
+            out[stage] = {"median_ms": round(statistics.median(ms), 3), "min_ms": round(min(ms), 3),
+                          "rows": samples[-1]["rows"], "bytes": samples[-1]["bytes"]}
+    return out
+
+
+def bench_scale(name, workdir, repeat, use_xlsx=True, seed=0, years=len(FISCAL_YEARS)):
+    scale = SCALES[name]
+    started = time.perf_counter()
+    if use_xlsx:
+        path, sheets = ensure_workbook(workdir, name, seed, years), None
+    else:
+        path, sheets = None, parsed_sheets(build_raw_sheets(scale, seed, fiscal_years_back(years)))
+    prepare_s = time.perf_counter() - started
+    runs = [run_once(path, sheets) for _ in range(repeat)]
+    return {"scale": vars(scale), "years": years, "prepare_s": round(prepare_s, 2), "repeat": repeat,
+            "stages": summarize(runs)}
+
+
+def environment():
+    return {
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "machine": platform.machine(),
+        "processor": platform.processor() or platform.machine(),
+        "cpus": os.cpu_count(),
+        "parse_workers": parse_workers(),
+        "parallel_min_mb": parallel_min_bytes() / 1024 / 1024,
+    }
+
+
+def _fmt_ms(ms):
+    return f"{ms:10.1f}" if ms is not None else f"{'-':>10}"
+
+
+def format_report(report, baseline=None):
+    # Plain-text table per scale; with a baseline report, adds the median change per stage
+    lines = []
+    for name, result in report["results"].items():
+        scale = result["scale"]
+        lines.append(f"== {name}: {scale['tns_rows']:,} TNS rows, {scale['employees']:,} employees, "
+                     f"{scale['expense_rows']:,} expense rows, {scale['sales_rows']:,} sales rows "
+                     f"(median of {result['repeat']})")
+        header = f"{'stage':<18}{'median ms':>10}{'min ms':>10}{'rows':>12}{'MB':>9}"
+        base = (baseline or {}).get("results", {}).get(name, {}).get("stages", {})
+        lines.append(header + (f"{'base ms':>10}{'change':>9}" if base else ""))
+        total = 0.0
+        for stage, s in result["stages"].items():
+            total += s["median_ms"]
+            line = f"{stage:<18}{_fmt_ms(s['median_ms'])}{_fmt_ms(s['min_ms'])}{s['rows']:>12,}{s['bytes'] / 1e6:>9.1f}"
+            if base:
+                before = base.get(stage, {}).get("median_ms")
+                change = f"{(s['median_ms'] - before) / before:+8.0%}" if before else f"{'-':>8}"
+                line += f"{_fmt_ms(before)} {change}"
+            lines.append(line)
+        lines.append(f"{'total':<18}{_fmt_ms(total)}")
+        lines.append("")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scales", nargs="+", default=["today", "small", "medium"], choices=list(SCALES))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workdir", default=DEFAULT_WORKDIR, help="where generated workbooks are kept")
+    parser.add_argument("--no-xlsx", action="store_true", help="skip xlsx/snapshot stages, build frames in memory")
+    parser.add_argument("--workers", help="sheet parsing processes (a number or 'auto'); default serial")
+    parser.add_argument("--years", type=int, default=len(FISCAL_YEARS), help="fiscal years per synthetic workbook")
+    parser.add_argument("--output", help="write the JSON report here")
+    parser.add_argument("--compare", help="baseline JSON report to diff against")
+    args = parser.parse_args(argv)
+    if args.workers:
+        # Via the environment so the load and snapshot stages both pick it up
+        os.environ[PARSE_WORKERS_ENV] = args.workers
+
+    report = {"environment": environment(), "results": {}}
+    for name in args.scales:
+        print(f"running {name} ...", file=sys.stderr, flush=True)
+        report["results"][name] = bench_scale(name, args.workdir, args.repeat, not args.no_xlsx, args.seed, args.years)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as fh:
+            baseline = json.load(fh)
+    print(format_report(report, baseline))
+    if args.output:
+        with open(args.output, "w") as fh:
+            json.dump(report, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
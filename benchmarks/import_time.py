@@ -0,0 +1,126 @@
+"""Import-time breakdown of the dashboard's cold start, checked against a budget.
+
+    python -m benchmarks.import_time                       # report only
+    python -m benchmarks.import_time --budget-ms 1500      # exit 1 when over budget (CI)
+    python -m benchmarks.import_time --output imports.json
+
+Each repeat starts a fresh interpreter with -X importtime that imports exactly the
+modules profitability_dashboard imports at module level, and sums the self time per
+top-level package. The report keeps the median per package over the repeats. Modules
+in DEFERRED must not be imported at startup at all: they are loaded only when a chart
+is drawn or a sheet is parsed from the xlsx.
+"""
+import argparse
+import ast
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DASHBOARD = os.path.join(ROOT, "profitability_dashboard.py")
+
+# Heavy modules that startup must not import (streamlit itself already loads core plotly)
+DEFERRED = ["plotly.express", "openpyxl"]
+
+
+def startup_modules(path=DASHBOARD):
+    # Module names imported at the top level of the dashboard script, in source order
+    tree = ast.parse(open(path).read(), path)
+    names = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            names.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            names.append(node.module)
+    return list(dict.fromkeys(names))
+
+
+def parse_importtime(stderr):
+    # -X importtime lines: "import time: <self us> | <cumulative us> | <indented module>"
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue
+        modules[fields[2].strip()] = int(fields[0]) / 1000
+    return modules
+
+
+def measure(modules):
+    # One cold interpreter: per-module self ms plus the wall time of the whole process
+    code = "; ".join(f"import {name}" for name in modules)
+    started = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=ROOT,
+                          capture_output=True, text=True, check=True)
+    return parse_importtime(proc.stderr), (time.perf_counter() - started) * 1000
+
+
+def by_package(modules):
+    totals = {}
+    for name, ms in modules.items():
+        root = name.split(".")[0]
+        totals[root] = totals.get(root, 0.0) + ms
+    return totals
+
+
+def deferred_violations(modules):
+    return sorted(d for d in DEFERRED if any(name == d or name.startswith(d + ".") for name in modules))
+
+
+def run(repeat=3):
+    startup = startup_modules()
+    runs = [measure(startup) for _ in range(repeat)]
+    packages = {}
+    for modules, _ in runs:
+        for root, ms in by_package(modules).items():
+            packages.setdefault(root, []).append(ms)
+    return {
+        "python": sys.version.split()[0],
+        "startup_modules": startup,
+        "repeat": repeat,
+        "import_ms": round(statistics.median(sum(m.values()) for m, _ in runs), 1),
+        "process_ms": round(statistics.median(wall for _, wall in runs), 1),
+        "packages": {root: round(statistics.median(ms), 1)
+                     for root, ms in sorted(packages.items(), key=lambda kv: -statistics.median(kv[1]))},
+        "deferred_imported": sorted({v for modules, _ in runs for v in deferred_violations(modules)}),
+    }
+
+
+def format_report(report, top=15):
+    lines = [f"{'package':<32}{'ms':>10}"]
+    for root, ms in list(report["packages"].items())[:top]:
+        lines.append(f"{root:<32}{ms:>10.1f}")
+    lines.append(f"{'total imports':<32}{report['import_ms']:>10.1f}")
+    lines.append(f"{'interpreter process':<32}{report['process_ms']:>10.1f}")
+    if report["deferred_imported"]:
+        lines.append(f"imported at startup but should be deferred: {', '.join(report['deferred_imported'])}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--budget-ms", type=float, help="fail when the median total import time exceeds this")
+    parser.add_argument("--top", type=int, default=15, help="packages to list")
+    parser.add_argument("--output", help="write the JSON report here")
+    args = parser.parse_args(argv)
+
+    report = run(args.repeat)
+    print(format_report(report, args.top))
+    if args.output:
+        with open(args.output, "w") as fh:
+            json.dump(report, fh, indent=2)
+    failed = bool(report["deferred_imported"])
+    if args.budget_ms is not None and report["import_ms"] > args.budget_ms:
+        print(f"over budget: {report['import_ms']:.1f} ms > {args.budget_ms:.1f} ms", file=sys.stderr)
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,235 @@
+import dataclasses
+import os
+
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook
+
+from profitability_engine import DOMAINS, fiscal_months, fy_start_year, fy_suffix
+from profitability_loader import (
+    DEFERRED_REVENUE_SHEET, EXPENSES_SHEET, PURCHASES_SHEET, SALARY_SHEET, SALES_SHEET, TNS_SHEET, normalize_periods,
+    range_bounds, sheet_layout,
+)
+
+# Synthetic workbooks with the same sheet layouts the dashboard reads, at any size.
+# Cell positions follow the real workbook: the loader's header rows, the Purchases
+# domain rows at 7-8, the salary month columns at D-O, TNS allocation % in I-M.
+
+SALARY_DOMAINS = ["Training Business ", "Tech Assist Recruitment", "Consulting Services & Project work",
+                  "WhatsApp API Business", "G-Suite Business", "Other Services"]
+EXPENSE_HEADS = ["Bank & payment gateway charges", "Others", "Insurance", "Interest on loan", "Rent",
+                 "Salary", "Website, Licenses & Subscriptions", "Travel", "Marketing", "Professional fees",
+                 "Foreign exchange loss", "Bonuses & Incentives", "Office expenses", "Telephone & Internet"]
+TNS_NATURES = ["Hotel Stay", "Event Expenses", "Marketing Material", "Lunch Conference", "Tour Package"]
+
+# Fiscal years of a generated workbook by default, newest first (as in the real workbook)
+FISCAL_YEARS = ["2025-26", "2024-25"]
+
+
+def fiscal_years_back(count, latest=FISCAL_YEARS[0]):
+    # `count` consecutive fiscal years ending with `latest`, newest first
+    start = fy_start_year(latest)
+    return [f"{year}-{(year + 1) % 100:02d}" for year in range(start, start - count, -1)]
+
+
+@dataclasses.dataclass(frozen=True)
+class Scale:
+    """Row counts per sheet; salary, expense and TNS counts apply to each fiscal year."""
+
+    sales_rows: int
+    employees: int
+    expense_rows: int
+    tns_rows: int
+
+
+# 'today' mirrors the current workbook; 'large' is the growth target (1M TNS rows, 5k employees)
+SCALES = {
+    "today": Scale(sales_rows=24, employees=130, expense_rows=40, tns_rows=25),
+    "small": Scale(sales_rows=240, employees=500, expense_rows=200, tns_rows=10_000),
+    "medium": Scale(sales_rows=2_400, employees=2_000, expense_rows=1_000, tns_rows=100_000),
+    "large": Scale(sales_rows=24_000, employees=5_000, expense_rows=4_000, tns_rows=1_000_000),
+}
+
+
+def _allocation(rng, rows, cols, one_hot_share=0.5):
+    # Allocation fractions per row summing to 1; about half the rows go wholly to one domain
+    alloc = rng.dirichlet(np.ones(cols), size=rows)
+    one_hot = rng.random(rows) < one_hot_share
+    alloc[one_hot] = np.eye(cols)[rng.integers(0, cols, one_hot.sum())]
+    return alloc.round(6)
+
+
+def sales_sheet(rng, scale, years=FISCAL_YEARS):
+    months = [m for fy in years for m in fiscal_months(fy)]
+    df = pd.DataFrame({
+        "Row Name": "Sales",
+        "Month": np.array(months, dtype="datetime64[us]")[rng.integers(0, len(months), scale.sales_rows)],
+    })
+    per_row = 24 / scale.sales_rows
+    for domain, mean in zip(DOMAINS, [4.5e6, 2.5e5, 1.2e6, 3.5e6, 2e5]):
+        df[domain] = rng.gamma(2.0, mean * per_row / 2.0, scale.sales_rows).round(2)
+    df = df.rename(columns={"Training Business": "Training Business "})
+    return [], df
+
+
+def deferred_revenue_sheet(rng, fy):
+    months = fiscal_months(fy)
+    revenue = rng.gamma(2.0, 1.6e6, len(months)).round(2)
+    billed = rng.gamma(2.0, 1.8e6, len(months)).round(2)
+    df = pd.DataFrame({
+        "Month": months,
+        "Revenue": revenue,
+        "Cumulative": revenue.cumsum(),
+        "Def. Rev.": (billed - revenue).round(2),
+        "G-Suite Business": np.nan,
+    })
+    return [], df
+
+
+def purchases_sheet(rng, fy):
+    # Title block in rows 0-5, month dates in row 6, the two domain rows at 7-8
+    width = 15
+    title = [["CEOITBOX Tech Services"], ["Address line"], ["Purchase Account"], ["Group Summary"], [], []]
+    header = [None, "Categorization"] + fiscal_months(fy) + ["Total"]
+    rows = []
+    for domain, mean in [("WhatsApp API Business", 5e5), ("G-Suite Business", 2.6e6)]:
+        values = rng.gamma(4.0, mean / 4.0, 12).round(2)
+        rows.append(["GST Purchase", domain] + values.tolist() + [float(values.sum())])
+    df = pd.DataFrame([header] + rows, columns=range(width))
+    return [r + [None] * (width - len(r)) for r in title], df
+
+
+def salary_sheet(rng, fy, scale):
+    n = scale.employees
+    df = pd.DataFrame({
+        "Tns/CBX": rng.choice(["TNS", "CBX"], n),
+        "S.no. ": np.arange(1, n + 1, dtype=float),
+        "Empolyee Name ": [f"Employee {i}" for i in range(1, n + 1)],
+    })
+    base = rng.gamma(3.0, 2e4, n)
+    for month in fiscal_months(fy):
+        df[month] = (base * rng.uniform(0.9, 1.1, n)).round(0)
+    df["TOTAL"] = df[fiscal_months(fy)].sum(axis=1)
+    df["TOTAL (Profitability)"] = np.nan
+    df["Status "] = np.nan
+    # Consulting is never allocated, matching the reported domains
+    alloc = iter(_allocation(rng, n, len(DOMAINS)).T)
+    for domain in SALARY_DOMAINS:
+        df[domain] = 0.0 if domain == "Consulting Services & Project work" else next(alloc)
+    df["total"] = 1.0
+    return [[f"Monthly Salary {fy_suffix(fy)}"]], df
+
+
+def expenses_sheet(rng, fy, scale):
+    n = scale.expense_rows
+    df = pd.DataFrame({
+        "": [f"Ledger {i}" for i in range(n)],
+        "Expenses": rng.choice(EXPENSE_HEADS, n),
+    })
+    base = rng.gamma(1.5, 4e4 * 40 / n, n)
+    for month in fiscal_months(fy):
+        df[month] = (base * rng.uniform(0.0, 2.0, n)).round(2)
+    df["Total"] = df[fiscal_months(fy)].sum(axis=1)
+    return [], df
+
+
+def tns_sheet(rng, fy, scale):
+    n = scale.tns_rows
+    months = np.array(fiscal_months(fy), dtype="datetime64[us]")
+    dates = months[rng.integers(0, 12, n)] + rng.integers(0, 28, n).astype("timedelta64[D]")
+    amount = rng.gamma(1.2, 8e4 * 25 / n, n).round(0)
+    df = pd.DataFrame({
+        "S.NO": np.arange(1, n + 1, dtype=float),
+        "Date ": dates,
+        "Month": dates.astype("datetime64[M]").astype("datetime64[us]"),
+        "Nature": rng.choice(TNS_NATURES, n),
+        "Party Name": rng.choice(["MICE VENTURES", "Zoom", "Porter", "TCV Hospitality"], n),
+        "Total": amount,
+        "Amount": amount,
+        "Categorization": rng.choice(EXPENSE_HEADS, n),
+    })
+    alloc = _allocation(rng, n, len(DOMAINS))
+    for i, domain in enumerate(DOMAINS):
+        df[domain] = alloc[:, i]
+    df["Total.1"] = 1.0
+    return [], df
+
+
+def build_raw_sheets(scale, seed=0, years=FISCAL_YEARS):
+    """Sheet name -> (rows above the header, frame) in the workbook's raw layout."""
+    rng = np.random.default_rng(seed)
+    sheets = {SALES_SHEET: sales_sheet(rng, scale, years)}
+    for fy in years:
+        suffix = fy_suffix(fy)
+        sheets[DEFERRED_REVENUE_SHEET.format(fy=suffix)] = deferred_revenue_sheet(rng, fy)
+        sheets[PURCHASES_SHEET.format(fy=suffix)] = purchases_sheet(rng, fy)
+        sheets[SALARY_SHEET.format(fy=suffix)] = salary_sheet(rng, fy, scale)
+        sheets[EXPENSES_SHEET.format(fy=suffix)] = expenses_sheet(rng, fy, scale)
+        sheets[TNS_SHEET.format(fy=suffix)] = tns_sheet(rng, fy, scale)
+    return sheets
+
+
+def _cell(value):
+    if isinstance(value, (np.generic,)):
+        value = value.item()
+    if isinstance(value, float) and np.isnan(value):
+        return None
+    return value
+
+
+def write_workbook(raw_sheets, path):
+    # Streaming (write-only) openpyxl so the million-row scale fits in memory
+    wb = Workbook(write_only=True)
+    for name, (preamble, df) in raw_sheets.items():
+        ws = wb.create_sheet(name)
+        for row in preamble:
+            ws.append(row)
+        if sheet_layout(name)[0] is not None:
+            ws.append([label if not isinstance(label, pd.Timestamp) else label.to_pydatetime() for label in df.columns])
+        for col_values in zip(*(_column_cells(df[c]) for c in df.columns)):
+            ws.append([_cell(v) for v in col_values])
+    tmp = f"{path}.tmp"
+    wb.save(tmp)
+    os.replace(tmp, path)
+
+
+def _column_cells(series):
+    if series.dtype.kind == "M":
+        return series.astype(object).where(series.notna(), None).tolist()
+    return series.tolist()
+
+
+def parsed_sheets(raw_sheets):
+    """The frames load_sheets() would return for these raw sheets, without an xlsx round trip."""
+    out = {}
+    for name, (preamble, df) in raw_sheets.items():
+        header, cell_range = sheet_layout(name)
+        if header is None:
+            body = pd.concat([pd.DataFrame(preamble, columns=df.columns), df], ignore_index=True)
+        else:
+            body = df.copy()
+            body.columns = [f"Unnamed: {i}" if label == "" else label for i, label in enumerate(df.columns)]
+            body.columns = [label.to_pydatetime() if isinstance(label, pd.Timestamp) else label for label in body.columns]
+        # Clip to the sheet's block in SHEET_LAYOUTS, as the streaming reader does
+        max_row, max_col = range_bounds(cell_range)
+        if max_row is not None:
+            above = len(preamble) + 1 if header is not None else 0
+            body = body.iloc[:max_row - above]
+        if max_col is not None:
+            body = body.iloc[:, :max_col]
+        out[name] = normalize_periods(body)
+    return out
+
+
+def workbook_path(directory, scale_name, seed=0, years=len(FISCAL_YEARS)):
+    suffix = f"_{years}y" if years != len(FISCAL_YEARS) else ""
+    return os.path.join(directory, f"synthetic_{scale_name}_{seed}{suffix}.xlsx")
+
+
+def ensure_workbook(directory, scale_name, seed=0, years=len(FISCAL_YEARS)):
+    # Generate the workbook once per (scale, seed, number of years); later runs reuse the file
+    path = workbook_path(directory, scale_name, seed, years)
+    if not os.path.exists(path):
+        os.makedirs(directory, exist_ok=True)
+        write_workbook(build_raw_sheets(SCALES[scale_name], seed, fiscal_years_back(years)), path)
+    return path
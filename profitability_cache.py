@@ -0,0 +1,88 @@
+import collections
+import os
+import sys
+import threading
+
+import pandas as pd
+
+# Process-wide LRU cache for rendered results (HTML tables, figure JSON) shared by every
+# session. Entries are keyed by (kind, workbook fingerprint, fiscal year, month), so a
+# new workbook version simply stops hitting the old entries until they are evicted.
+CACHE_MB_ENV = "PROFITABILITY_CACHE_MB"
+DEFAULT_CACHE_MB = 256
+# PROFITABILITY_CACHE_MB is in MiB; anything that displays cache sizes divides by this too
+MIB = 1024 * 1024
+
+
+def size_of(value):
+    # Approximate resident bytes of a cached value
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, str):
+        return len(value)
+    if isinstance(value, (tuple, list)):
+        return sum(size_of(v) for v in value)
+    return sys.getsizeof(value)
+
+
+class ResultCache:
+    """Thread-safe LRU cache bounded by total size rather than entry count.
+
+    Values are computed outside the lock, so two sessions missing the same key at once
+    may both compute it; the second insert simply replaces the first.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = int(max_bytes)
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @classmethod
+    def from_env(cls):
+        return cls(float(os.environ.get(CACHE_MB_ENV, DEFAULT_CACHE_MB)) * MIB)
+
+    def get_or_compute(self, key, compute):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+        value = compute()
+        size = size_of(value)
+        if size > self.max_bytes:
+            return value
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._entries[key] = (value, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+                self.evictions += 1
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
@@ -0,0 +1,119 @@
+import contextlib
+import contextvars
+import datetime
+import json
+import os
+import time
+
+import numpy as np
+
+# Lightweight per-stage timing. The dashboard starts a Recorder at the top of each rerun;
+# engine and render code wrap their stages in span(), which is a no-op when nothing is
+# recording (batch jobs, benchmarks that don't ask for it).
+TIMINGS_LOG = "profitability_timings.jsonl"
+
+_current = contextvars.ContextVar("profitability_recorder", default=None)
+
+
+class Recorder:
+    """Collects the spans of one run: stage name, wall time (ms), rows and bytes."""
+
+    def __init__(self):
+        self.spans = []
+        self._start = time.perf_counter()
+
+    def total_ms(self):
+        return (time.perf_counter() - self._start) * 1000
+
+    def to_record(self, **context):
+        return {
+            "ts": datetime.datetime.now().isoformat(timespec="seconds"),
+            **context,
+            "total_ms": round(self.total_ms(), 3),
+            "spans": self.spans,
+        }
+
+
+def start_recording():
+    # Make a fresh Recorder current for this thread/context and return it
+    recorder = Recorder()
+    _current.set(recorder)
+    return recorder
+
+
+@contextlib.contextmanager
+def recording():
+    recorder = Recorder()
+    token = _current.set(recorder)
+    try:
+        yield recorder
+    finally:
+        _current.reset(token)
+
+
+@contextlib.contextmanager
+def span(stage, rows=0, nbytes=0, **fields):
+    # Time a stage; the yielded dict can be updated with rows/bytes once they are known.
+    # Extra keyword fields (e.g. fy) are stored with the span.
+    info = {"stage": stage, **fields, "rows": int(rows), "bytes": int(nbytes)}
+    recorder = _current.get()
+    if recorder is None:
+        yield info
+        return
+    start = time.perf_counter()
+    try:
+        yield info
+    finally:
+        info["ms"] = round((time.perf_counter() - start) * 1000, 3)
+        recorder.spans.append(info)
+
+
+def frame_size(df):
+    # (rows, bytes) of a parsed sheet, for span bookkeeping; shallow so it stays cheap
+    return len(df), int(df.memory_usage(index=False, deep=False).sum())
+
+
+def append_log(record, path=TIMINGS_LOG):
+    # One JSON object per line; logging must never break the dashboard
+    try:
+        with open(path, "a") as fh:
+            fh.write(json.dumps(record) + "\n")
+    except OSError:
+        pass
+
+
+def tail_lines(path, count, block=1 << 16):
+    # Last `count` lines of a file as bytes, read backwards from its end in blocks, so the
+    # cost stays flat however long the (never rotated) log grows
+    if count <= 0:
+        return []
+    with open(path, "rb") as fh:
+        end = fh.seek(0, os.SEEK_END)
+        data = b""
+        # One newline more than `count` guarantees the first kept line is complete
+        while end > 0 and data.count(b"\n") <= count:
+            start = max(0, end - block)
+            fh.seek(start)
+            data = fh.read(end - start) + data
+            end = start
+    return data.splitlines()[-count:]
+
+
+def latency_percentiles(path=TIMINGS_LOG, last=500, percentiles=(50, 95)):
+    # p50/p95 of total render time per section ("page", a fiscal year, "yoy") over the last
+    # `last` logged runs, grouped in one pass over the log's tail ({} when there is no log yet)
+    try:
+        lines = tail_lines(path, last)
+    except OSError:
+        return {}
+    totals = {}
+    for line in lines:
+        try:
+            entry = json.loads(line)
+            totals.setdefault(entry.get("section"), []).append(float(entry["total_ms"]))
+        except (ValueError, KeyError, TypeError, AttributeError):
+            continue
+    return {
+        section: {f"p{p}": float(np.percentile(values, p)) for p in percentiles} | {"runs": len(values)}
+        for section, values in totals.items()
+    }
@@ -0,0 +1,477 @@
+import concurrent.futures
+import contextvars
+import datetime
+
+import numpy as np
+import pandas as pd
+
+from profitability_diagnostics import frame_size, span
+from profitability_loader import (
+    DEFERRED_REVENUE_SHEET, EXPENSES_SHEET, PURCHASES_SHEET, SALARY_SHEET, SALES_SHEET, TNS_SHEET, fy_suffixes,
+    period_columns,
+)
+
+# Headless P&L engine: takes the sheets loaded by profitability_loader and returns the
+# numeric P&L for one fiscal year and month selection. Must not import streamlit so it
+# can run from batch jobs, cache warmers and benchmarks.
+
+# Fiscal months in display order (the fiscal year runs April to March)
+MONTHS = ["April", "May", "June", "July", "August", "September", "October", "November", "December", "January", "February", "March"]
+MONTH_NUMBERS = {name: (idx + 3) % 12 + 1 for idx, name in enumerate(MONTHS)}
+ALL_MONTHS = "All"
+# Named runs of fiscal months: name -> (first month, last month), inclusive
+RANGES = {
+    "Q1": ("April", "June"),
+    "Q2": ("July", "September"),
+    "Q3": ("October", "December"),
+    "Q4": ("January", "March"),
+    "H1": ("April", "September"),
+    "H2": ("October", "March"),
+}
+
+# Business domains in column order; 'Consulting Services & Project work' is not reported
+DOMAINS = ["Training Business", "Tech Assist Recruitment", "WhatsApp API Business", "G-Suite Business", "Other Services"]
+
+SALES = "Sales"
+DEFERRED_REVENUE = "Deferred Revenue"
+PURCHASE = "Purchase"
+GROSS_PROFIT = "Gross Profit"
+SALARY = "Salary & Incentives"
+TNS_EXPENSES = "TNS Expenses"
+NET_PROFIT = "Net Profit"
+NET_PROFIT_PCT = "Net Profit %"
+TOTAL = "Total"
+# Year-over-year measures next to the two fiscal years' amounts
+CHANGE = "Change"
+CHANGE_PCT = "Change %"
+# Cube component holding the unallocated expense heads
+EXPENSES = "Expenses"
+
+
+def fy_suffix(fy):
+    # "2025-26" -> "25-26", the suffix used in the workbook's sheet names
+    return fy[2:]
+
+
+def fiscal_year(suffix):
+    # "25-26" -> "2025-26"
+    return f"20{suffix}"
+
+
+def fiscal_years(names):
+    """Fiscal years with a complete set of sheets among `names` (sheet names or a sheets dict), newest first."""
+    return [fiscal_year(suffix) for suffix in fy_suffixes(names)]
+
+
+def fy_start_year(fy):
+    return int(fy[:4])
+
+
+def fiscal_month(fy, month):
+    # First day of a fiscal month; April-December fall in the start year, January-March in the next
+    number = MONTH_NUMBERS[month]
+    year = fy_start_year(fy) + (1 if number < 4 else 0)
+    return datetime.datetime(year, number, 1)
+
+
+def month_span(month=ALL_MONTHS):
+    # Inclusive (first, last) month positions of a selection: "All", a month name, a
+    # RANGES name or a (first month, last month) pair such as ("April", "November")
+    if month == ALL_MONTHS:
+        return 0, len(MONTHS) - 1
+    if isinstance(month, str):
+        month = RANGES.get(month, (month, month))
+    first, last = MONTHS.index(month[0]), MONTHS.index(month[1])
+    if first > last:
+        raise ValueError(f"{month[0]} comes after {month[1]} in the fiscal year")
+    return first, last
+
+
+def fiscal_months(fy, month=ALL_MONTHS):
+    first, last = month_span(month)
+    return [fiscal_month(fy, m) for m in MONTHS[first:last + 1]]
+
+
+def period_label(fy, month=ALL_MONTHS):
+    # 'Apr-25 to Mar-26' for the whole year or any run of months, 'Jan-26' for a single month
+    months = fiscal_months(fy, month)
+    if len(months) == 1:
+        return months[0].strftime("%b-%y")
+    return f"{months[0]:%b-%y} to {months[-1]:%b-%y}"
+
+
+def fiscal_periods(fy):
+    # The FY's twelve integer period codes, e.g. 202504 ... 202603
+    return [m.year * 100 + m.month for m in fiscal_months(fy)]
+
+
+def fiscal_positions(codes, fy):
+    # Period code -> month position within the fiscal year (0 = April), -1 when outside it.
+    # Pure integer arithmetic, so placing every row of a sheet is one vectorized step.
+    codes = np.asarray(codes, dtype=np.int64)
+    pos = (codes // 100 - fy_start_year(fy)) * 12 + codes % 100 - 4
+    return np.where((codes > 0) & (pos >= 0) & (pos < len(MONTHS)), pos, -1)
+
+
+def _strip_labels(df):
+    df = df.copy()
+    df.columns = df.columns.map(lambda x: x.strip() if isinstance(x, str) else x)
+    return df
+
+
+def month_columns(df, fy):
+    # Column position of each fiscal month in a sheet with month headers (None when absent)
+    index = period_columns(df)
+    return [index.get(code) for code in fiscal_periods(fy)]
+
+
+def _month_matrix(df, fy):
+    # rows x 12 numeric matrix of the fiscal months' columns; missing months are zeros
+    out = np.zeros((len(df), len(MONTHS)))
+    for i, pos in enumerate(month_columns(df, fy)):
+        if pos is not None:
+            out[:, i] = pd.to_numeric(df.iloc[:, pos], errors="coerce").fillna(0.0).to_numpy(dtype=float)
+    return out
+
+
+def _numeric(df, cols):
+    return df.reindex(columns=cols).apply(pd.to_numeric, errors="coerce").fillna(0.0).to_numpy(dtype=float)
+
+
+def _by_month(pos, amounts):
+    # Scatter-add row amounts (rows x DOMAINS) into months x DOMAINS
+    out = np.zeros((len(MONTHS), len(DOMAINS)))
+    np.add.at(out, pos, amounts)
+    return out
+
+
+# The *_rows functions return the row-level facts behind each line: the fiscal month
+# position of every row and its rows x DOMAINS amounts. The monthly_* builders sum them
+# per month; the SQLite store keeps them as fact rows.
+
+# --- Sales ---
+def sales_rows(df_sales, fy):
+    df = _strip_labels(df_sales)
+    pos = fiscal_positions(df["Month"], fy)
+    keep = pos >= 0
+    if "FY" in df.columns:
+        keep &= (df["FY"] == fy).to_numpy()
+    return pos[keep], _numeric(df, DOMAINS)[keep]
+
+
+def monthly_sales(df_sales, fy):
+    return _by_month(*sales_rows(df_sales, fy))
+
+
+# --- Deferred Revenue (booked entirely against G-Suite Business) ---
+def deferred_revenue_rows(df_def, fy):
+    if "Def. Rev." not in df_def.columns:
+        return np.zeros(0, dtype=np.int64), np.zeros((0, len(DOMAINS)))
+    pos = fiscal_positions(df_def["Month"], fy)
+    keep = pos >= 0
+    amounts = np.zeros((int(keep.sum()), len(DOMAINS)))
+    amounts[:, DOMAINS.index("G-Suite Business")] = _numeric(df_def, ["Def. Rev."])[keep, 0]
+    return pos[keep], amounts
+
+
+def monthly_deferred_revenue(df_def, fy):
+    return _by_month(*deferred_revenue_rows(df_def, fy))
+
+
+# --- Purchase ---
+def monthly_purchase(df_pur):
+    # Rows 7-8 are the domain rows, columns 2-13 are the twelve fiscal months
+    out = np.zeros((len(MONTHS), len(DOMAINS)))
+    for name, values in zip(df_pur.iloc[7:9, 1], df_pur.iloc[7:9, 2:14].values):
+        if name in DOMAINS:
+            out[:, DOMAINS.index(name)] = pd.to_numeric(pd.Series(values), errors="coerce").fillna(0.0).to_numpy()
+    return out
+
+
+def purchase_rows(df_pur, fy):
+    # The sheet is already one amount per month and domain
+    return np.arange(len(MONTHS)), monthly_purchase(df_pur)
+
+
+# --- Salary & Incentives ---
+def monthly_salary(df_salary, fy):
+    # (employees x months)^T @ (employees x domain allocation) gives the month x domain
+    # salary cost for the whole year in one product
+    df = _strip_labels(df_salary)
+    return _month_matrix(df, fy).T @ _numeric(df, DOMAINS)
+
+
+def salary_rows(df_salary, fy):
+    # One row per employee and month: that month's salary times the domain allocation
+    df = _strip_labels(df_salary)
+    salary, allocation = _month_matrix(df, fy), _numeric(df, DOMAINS)
+    amounts = salary.T[:, :, np.newaxis] * allocation[np.newaxis, :, :]
+    return np.repeat(np.arange(len(MONTHS)), len(df)), amounts.reshape(-1, len(DOMAINS))
+
+
+# --- Expenses (head x month totals; allocated to domains by share of sales later) ---
+def monthly_expenses(df_exp, fy):
+    # One grouped sum gives the expense-head x month matrix; heads keep sheet order
+    amounts = pd.DataFrame(_month_matrix(df_exp, fy))
+    by_head = amounts.groupby(df_exp["Expenses"].to_numpy(), sort=False).sum()
+    return list(by_head.index), by_head.to_numpy(dtype=float).T
+
+
+def expense_rows(df_exp, fy):
+    # Heads in sheet order, then (head position, month position, amount) per sheet row and month
+    heads = df_exp["Expenses"].to_numpy()
+    order = list(pd.unique(heads[pd.notna(heads)]))
+    head_pos = pd.Index(order).get_indexer(heads)
+    keep = head_pos >= 0
+    amounts = _month_matrix(df_exp, fy)[keep]
+    months = np.tile(np.arange(len(MONTHS)), len(amounts))
+    return order, np.repeat(head_pos[keep], len(MONTHS)), months, amounts.ravel()
+
+
+# --- TNS Expenses (per-row allocation % in columns I to M) ---
+def tns_rows(df_tns, fy):
+    # Amount x allocation% for every row and domain at once. Non-numeric cells count as 0;
+    # also returns how many were coerced.
+    df = _strip_labels(df_tns)
+    df = df.loc[:, ~df.columns.duplicated()]
+    domain_cols = list(df.columns[8:13])  # I to M
+    raw = df[["Amount"] + domain_cols]
+    numeric = raw.apply(pd.to_numeric, errors="coerce")
+    coerced = int((numeric.isna() & raw.notna()).to_numpy().sum())
+    values = numeric.fillna(0.0).to_numpy(dtype=float)
+    allocated = values[:, :1] * values[:, 1:]
+    pos = fiscal_positions(df["Month"], fy)
+    keep = pos >= 0
+    return pos[keep], allocated[keep], coerced
+
+
+def monthly_tns(df_tns, fy):
+    # Row allocations scatter-added into each row's fiscal month; returns the coerced count too
+    pos, allocated, coerced = tns_rows(df_tns, fy)
+    return _by_month(pos, allocated), coerced
+
+
+# Additive lines stored per month in the cube; everything else is derived after slicing
+BASE_LINES = [SALES, DEFERRED_REVENUE, PURCHASE, SALARY, TNS_EXPENSES]
+
+# Base line -> (diagnostics stage, builder(sheet, fy) returning months x DOMAINS)
+LINE_BUILDERS = {
+    SALES: ("sales", monthly_sales),
+    DEFERRED_REVENUE: ("deferred_revenue", monthly_deferred_revenue),
+    PURCHASE: ("purchases", lambda df, fy: monthly_purchase(df)),
+    SALARY: ("salary", monthly_salary),
+}
+
+
+def cube_sources(fy):
+    # Workbook sheet each cube component is computed from (see the loader's layout registry)
+    suffix = fy_suffix(fy)
+    return {
+        SALES: SALES_SHEET,
+        DEFERRED_REVENUE: DEFERRED_REVENUE_SHEET.format(fy=suffix),
+        PURCHASE: PURCHASES_SHEET.format(fy=suffix),
+        SALARY: SALARY_SHEET.format(fy=suffix),
+        EXPENSES: EXPENSES_SHEET.format(fy=suffix),
+        TNS_EXPENSES: TNS_SHEET.format(fy=suffix),
+    }
+
+
+class PnLCube:
+    """Dense month x line x domain amounts for one fiscal year.
+
+    `values[m, l, d]` holds the BASE_LINES and `expenses[m, h]` the unallocated expense
+    heads. A single month is an index into these arrays and any other run of months
+    (quarter, half, year to date, custom range) one subtraction of prefix sums along the
+    month axis, so its cost does not depend on its length. Gross Profit, expense
+    allocation by sales share, Net Profit and Net Profit % are derived from the selected
+    slice, so a range keeps the ratio semantics of its own totals.
+    `versions` records the fingerprint of each source sheet the cube was built from and
+    `issues` the warnings raised per component, so a rebuild can keep unchanged parts.
+    """
+
+    def __init__(self, fy, values, expense_heads, expenses, has_tns=True, issues=None, versions=None):
+        self.fy = fy
+        self.values = values
+        self.expense_heads = list(expense_heads)
+        self.expenses = expenses
+        self.has_tns = has_tns
+        self.issues = dict(issues or {})
+        self.warnings = [msg for msgs in self.issues.values() for msg in msgs]
+        self.versions = dict(versions or {})
+        self._annual = (values.sum(axis=0), expenses.sum(axis=0))
+        # cumulative[k] = sum of months 0..k-1, so months first..last = cumulative[last + 1] - cumulative[first]
+        self._cumulative = tuple(
+            np.concatenate([np.zeros((1,) + a.shape[1:]), a.cumsum(axis=0)]) for a in (values, expenses)
+        )
+
+    def slice(self, month=ALL_MONTHS):
+        if month == ALL_MONTHS:
+            return self._annual
+        first, last = month_span(month)
+        if first == last:
+            return self.values[first], self.expenses[first]
+        # Rounded to 1e-6 so cancellation in the subtraction cannot leave phantom amounts
+        # (a domain with no sales in the range must still read exactly 0)
+        return tuple(np.round(c[last + 1] - c[first], 6) for c in self._cumulative)
+
+    def latest_month(self):
+        # Last fiscal month with Sales booked, or None for an empty year. Expense heads are
+        # left out: amortized rows (e.g. license fees) are filled in ahead for the whole year.
+        booked = np.flatnonzero(self.values[:, BASE_LINES.index(SALES)].any(axis=1))
+        return MONTHS[booked[-1]] if len(booked) else None
+
+    def year_to_date(self):
+        # ("April", latest month with Sales): the selection for a year-to-date view
+        latest = self.latest_month()
+        return (MONTHS[0], latest) if latest else ALL_MONTHS
+
+    def pnl(self, month=ALL_MONTHS):
+        base, expense_totals = self.slice(month)
+        with span("net_profit", rows=len(BASE_LINES) + len(self.expense_heads), fy=self.fy):
+            return assemble_pnl(base, self.expense_heads, expense_totals, self.has_tns, self.warnings)
+
+
+def assemble_pnl(base, expense_heads, expense_totals, has_tns=True, warnings=()):
+    # Turn one slice of base lines (BASE_LINES x DOMAINS) plus expense head totals into the P&L frame
+    sales, deferred, purchase, salary, tns = (base[BASE_LINES.index(line)] for line in BASE_LINES)
+    gross_profit = sales - deferred - purchase
+    total_sales = sales.sum()
+    ratios = sales / total_sales if total_sales != 0 else np.zeros_like(sales)
+    allocated = np.outer(expense_totals, ratios)
+
+    labels = [SALES, DEFERRED_REVENUE, PURCHASE, GROSS_PROFIT, SALARY] + list(expense_heads)
+    blocks = [np.vstack([sales, deferred, purchase, gross_profit, salary]), allocated]
+    if has_tns:
+        labels.append(TNS_EXPENSES)
+        blocks.append(tns[np.newaxis, :])
+    body = np.vstack(blocks)
+    # Everything from Salary & Incentives down is an expense line
+    net_profit = gross_profit - body[labels.index(SALARY):].sum(axis=0)
+    body = np.vstack([body, net_profit])
+    labels.append(NET_PROFIT)
+    body = np.hstack([body, body.sum(axis=1, keepdims=True)])
+    sales_total, net_total = body[0], body[-1]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pct = np.where(sales_total != 0, net_total * 100 / np.where(sales_total != 0, sales_total, 1), 0.0)
+    body = np.vstack([body, pct])
+    labels.append(NET_PROFIT_PCT)
+
+    pnl = pd.DataFrame(body, index=pd.Index(labels, name="Particulars"), columns=DOMAINS + [TOTAL])
+    pnl.attrs["warnings"] = list(warnings)
+    return pnl
+
+
+def build_cube(sheets, fy, versions=None, previous=None):
+    """Materialise the month x line x domain cube for one fiscal year from the loaded sheets.
+
+    `versions` maps sheet names to content fingerprints. Given the `previous` cube for the
+    same fiscal year, only components whose source sheet fingerprint changed are
+    recomputed (a TNS edit does not touch Sales or Salary); the rest are copied over.
+    """
+    sources = cube_sources(fy)
+    versions = dict(versions or {})
+    incremental = previous is not None and previous.fy == fy and bool(versions)
+
+    def stale(component):
+        name = sources[component]
+        return not incremental or versions.get(name) is None or previous.versions.get(name) != versions[name]
+
+    if incremental:
+        values = previous.values.copy()
+        expense_heads, expenses = previous.expense_heads, previous.expenses
+        has_tns, issues = previous.has_tns, dict(previous.issues)
+    else:
+        values = np.zeros((len(MONTHS), len(BASE_LINES), len(DOMAINS)))
+        has_tns, issues = True, {}
+
+    for line, (stage, builder) in LINE_BUILDERS.items():
+        if stale(line):
+            df = sheets[sources[line]]
+            with span(stage, *frame_size(df), fy=fy):
+                values[:, BASE_LINES.index(line)] = builder(df, fy)
+    if stale(EXPENSES):
+        df = sheets[sources[EXPENSES]]
+        with span("expenses", *frame_size(df), fy=fy):
+            expense_heads, expenses = monthly_expenses(df, fy)
+    if stale(TNS_EXPENSES):
+        suffix = fy_suffix(fy)
+        has_tns, issues[TNS_EXPENSES] = True, []
+        with span("tns", fy=fy) as stage:
+            try:
+                df = sheets[sources[TNS_EXPENSES]]
+                stage["rows"], stage["bytes"] = frame_size(df)
+                values[:, BASE_LINES.index(TNS_EXPENSES)], coerced = monthly_tns(df, fy)
+                if coerced:
+                    issues[TNS_EXPENSES].append(f"TNS Expenses {suffix}: {coerced} non-numeric Amount/allocation cells counted as 0")
+            except Exception as e:
+                has_tns = False
+                values[:, BASE_LINES.index(TNS_EXPENSES)] = 0.0
+                issues[TNS_EXPENSES].append(f"Could not load TNS Expenses {suffix}: {e}")
+    used = {name: versions.get(name) for name in sources.values()}
+    return PnLCube(fy, values, expense_heads, expenses, has_tns, issues, used)
+
+
+def build_cubes(sheets, versions=None, previous=None, workers=None):
+    """Cubes for every fiscal year found in `sheets`, newest first, built concurrently.
+
+    Each year only reads its own sheets (plus the shared Sales frame), so years build
+    independently in a thread pool; spans land in the caller's recorder. `previous` maps
+    fiscal year -> cube from the last build, reused per component as in build_cube.
+    """
+    years = fiscal_years(sheets)
+    previous = previous or {}
+    if len(years) < 2 or workers == 1:
+        return {fy: build_cube(sheets, fy, versions, previous.get(fy)) for fy in years}
+    with concurrent.futures.ThreadPoolExecutor(min(workers or len(years), len(years))) as pool:
+        futures = {
+            fy: pool.submit(contextvars.copy_context().run, build_cube, sheets, fy, versions, previous.get(fy))
+            for fy in years
+        }
+        return {fy: future.result() for fy, future in futures.items()}
+
+
+def compute_pnl(sheets, fy, month=ALL_MONTHS):
+    """Numeric P&L for one fiscal year: line items x domains plus a Total column.
+
+    `month` is "All", a month name from MONTHS, a RANGES name or a (first month, last
+    month) pair. Problems with optional sheets are
+    collected in `pnl.attrs["warnings"]` instead of aborting the computation. Callers
+    that need several month views should build the cube once with build_cube().
+    """
+    return build_cube(sheets, fy).pnl(month)
+
+
+def _merge_labels(current, previous):
+    # Current year's row order; rows only the previous year has (an expense head that was
+    # dropped) go right after the row that precedes them there
+    labels = list(current)
+    for i, label in enumerate(previous):
+        if label not in labels:
+            after = previous[i - 1] if i else None
+            labels.insert(labels.index(after) + 1 if after in labels else len(labels), label)
+    return labels
+
+
+def compare_pnl(current, previous, names=("Current", "Previous")):
+    """Year-over-year comparison of two numeric P&Ls (e.g. the same months of two FYs).
+
+    Rows and columns are matched by label, not position, so differing expense heads line
+    up; a line one year lacks reads 0 there. Returns one frame with (column, measure)
+    columns: both years' amounts under `names`, CHANGE and CHANGE_PCT (relative to the
+    previous amount, NaN where that is 0). The Net Profit % row's CHANGE is in percentage
+    points and its CHANGE_PCT is NaN. All measures come from one aligned array operation.
+    """
+    labels = _merge_labels(current.index, previous.index)
+    columns = _merge_labels(current.columns, previous.columns)
+    cur = current.reindex(index=labels, columns=columns, fill_value=0.0).to_numpy(dtype=float)
+    prev = previous.reindex(index=labels, columns=columns, fill_value=0.0).to_numpy(dtype=float)
+    change = cur - prev
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pct = np.where(prev != 0, change * 100 / np.abs(np.where(prev != 0, prev, 1)), np.nan)
+    pct[np.asarray(labels) == NET_PROFIT_PCT] = np.nan
+    body = np.stack([cur, prev, change, pct], axis=2).reshape(len(labels), -1)
+    measures = list(names) + [CHANGE, CHANGE_PCT]
+    comparison = pd.DataFrame(body, index=pd.Index(labels, name=current.index.name),
+                              columns=pd.MultiIndex.from_product([columns, measures]))
+    comparison.attrs["warnings"] = current.attrs.get("warnings", []) + previous.attrs.get("warnings", [])
+    return comparison
@@ -0,0 +1,470 @@
+import concurrent.futures
+import datetime
+import hashlib
+import multiprocessing
+import os
+import posixpath
+import re
+import xml.etree.ElementTree as ET
+import zipfile
+
+import numpy as np
+import pandas as pd
+from pandas.io.parsers import TextParser
+
+EXCEL_FILE = "Profitability_CEOITBOX.xlsx"
+
+# Workbook layout registry. Sheets are found by name: "Sales" is shared by every fiscal
+# year, the others exist once per year with the year's short form ("25-26") in place of
+# "{fy}". Any year whose required sheets are all present is picked up, so adding a year
+# to the workbook needs no code change.
+SALES_SHEET = "Sales"
+DEFERRED_REVENUE_SHEET = "Deferred Revenue {fy}"
+PURCHASES_SHEET = "Purchases {fy}"
+SALARY_SHEET = "Monthly Salary {fy}"
+EXPENSES_SHEET = "Expenses {fy}"
+TNS_SHEET = "Expense - TNS {fy}"
+
+# How each sheet is read: the row pandas should use as header (None = no header) and a
+# declarative extraction spec, the block of the sheet the engine actually uses, in A1
+# notation ("A:X" = every row of columns A-X; None = the whole sheet). Blocks start at
+# column A so positional lookups (Purchases rows 7-8, TNS allocation in I-M) see the same
+# positions as a full read; the streaming reader skips cells outside the block and stops
+# after its last row.
+SHEET_LAYOUTS = {
+    SALES_SHEET: (0, None),
+    DEFERRED_REVENUE_SHEET: (0, "A:J"),  # Month (A), Def. Rev. (J)
+    PURCHASES_SHEET: (None, "A1:N9"),  # domain rows 8-9, names in B, months in C-N
+    SALARY_SHEET: (1, "A:X"),  # months in D-O, domain allocation in S-X
+    EXPENSES_SHEET: (0, "A:N"),  # expense head in B, months in C-N
+    TNS_SHEET: (0, "A:M"),  # Month, Amount, allocation % in I-M
+}
+# Per-year sheets a year can do without (the engine reports it instead)
+OPTIONAL_SHEETS = {TNS_SHEET}
+
+_FY_TEMPLATES = [template for template in SHEET_LAYOUTS if "{fy}" in template]
+_FY_PATTERNS = {
+    template: re.compile(re.escape(template).replace(re.escape("{fy}"), r"(\d{2}-\d{2})") + "$")
+    for template in _FY_TEMPLATES
+}
+
+# Opt-in parallel parsing: number of worker processes used to parse sheets, or "auto" for
+# one per core. Unset, 0 or 1 parses serially in the calling process.
+PARSE_WORKERS_ENV = "PROFITABILITY_PARSE_WORKERS"
+# Each spawned worker re-imports pandas before it parses anything (about a second), so
+# the pool is only used when the requested worksheets hold at least this many bytes of
+# uncompressed XML (serial parsing runs at roughly 5 MB/s). Overridable in MiB.
+PARALLEL_MIN_MB_ENV = "PROFITABILITY_PARALLEL_MIN_MB"
+PARALLEL_MIN_MB = 64
+
+
+def file_fingerprint(path=EXCEL_FILE):
+    # Content hash of the workbook; used as cache key so only an edited file triggers a reparse
+    sha = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(1 << 20), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+_MAIN_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+_REL_NS = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+_PKG_REL_NS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+_SHARED_STRING_CELL = re.compile(rb'<c\b[^>]*\bt="s"[^>]*>\s*<v>(\d+)</v>')
+_SHARED_STRING_END = re.compile(rb"</si>")
+
+
+def _workbook_parts(xlsx):
+    # Sheet name -> worksheet part (e.g. 'xl/worksheets/sheet7.xml'), plus the shared
+    # strings and styles parts (None when the workbook has none)
+    rels = ET.fromstring(xlsx.read("xl/_rels/workbook.xml.rels"))
+    targets, shared_strings, styles = {}, None, None
+    for rel in rels.iter(f"{_PKG_REL_NS}Relationship"):
+        target = rel.get("Target")
+        target = target.lstrip("/") if target.startswith("/") else posixpath.normpath(posixpath.join("xl", target))
+        targets[rel.get("Id")] = target
+        if rel.get("Type", "").endswith("/sharedStrings"):
+            shared_strings = target
+        elif rel.get("Type", "").endswith("/styles"):
+            styles = target
+    workbook = ET.fromstring(xlsx.read("xl/workbook.xml"))
+    sheets = {
+        sheet.get("name"): targets.get(sheet.get(f"{_REL_NS}id"))
+        for sheet in workbook.iter(f"{_MAIN_NS}sheet")
+    }
+    return sheets, shared_strings, styles
+
+
+def sheet_layout(name):
+    # (header row, range) of a registered sheet, or None for a sheet the dashboard ignores
+    if name in SHEET_LAYOUTS:
+        return SHEET_LAYOUTS[name]
+    for template, pattern in _FY_PATTERNS.items():
+        if pattern.match(name):
+            return SHEET_LAYOUTS[template]
+    return None
+
+
+def sheet_range(name):
+    layout = sheet_layout(name)
+    return layout[1] if layout else None
+
+
+def fy_sheets(suffix):
+    # The per-year sheet names of one fiscal year, e.g. fy_sheets("25-26")
+    return [template.format(fy=suffix) for template in _FY_TEMPLATES]
+
+
+def fy_suffixes(names):
+    """Short forms ("25-26") of the fiscal years with every required sheet in `names`, newest first."""
+    names = set(names)
+    found = {match.group(1) for name in names for pattern in _FY_PATTERNS.values() if (match := pattern.match(name))}
+    required = [template for template in _FY_TEMPLATES if template not in OPTIONAL_SHEETS]
+    complete = [suffix for suffix in found if all(t.format(fy=suffix) in names for t in required)]
+    return sorted(complete, reverse=True)
+
+
+def sheet_headers(names):
+    # {sheet: header row} for every registered sheet present in `names`: the shared sheets,
+    # then each discovered fiscal year's sheets, newest year first
+    names = set(names)
+    wanted = [name for name in SHEET_LAYOUTS if "{fy}" not in name]
+    wanted += [name for suffix in fy_suffixes(names) for name in fy_sheets(suffix)]
+    return {name: sheet_layout(name)[0] for name in wanted if name in names}
+
+
+def workbook_sheet_names(path=EXCEL_FILE):
+    with zipfile.ZipFile(path) as xlsx:
+        return list(_workbook_parts(xlsx)[0])
+
+
+def sheet_fingerprints(path=EXCEL_FILE, names=None, known=None):
+    """Per-sheet content fingerprints taken from the parts inside the xlsx zip.
+
+    A worksheet part's CRC and size come from the zip directory, so unchanged sheets are
+    never decompressed. Text cells only hold indexes into the shared strings table, so
+    each fingerprint also covers the prefix of that table the sheet can reference (up to
+    the highest index it uses). `known` is a previous result: its `max_string` is reused
+    for parts whose CRC and size did not change. `names` defaults to every sheet the
+    layout registry finds in the workbook.
+    """
+    known = known or {}
+    out = {}
+    with zipfile.ZipFile(path) as xlsx:
+        parts, shared_strings, _ = _workbook_parts(xlsx)
+        names = sheet_headers(parts) if names is None else names
+        string_ends = None
+        for name in names:
+            part = parts.get(name)
+            if part is None:
+                continue
+            info = xlsx.getinfo(part)
+            previous = known.get(name) or {}
+            if previous.get("part_crc") == info.CRC and previous.get("part_size") == info.file_size:
+                max_string = previous["max_string"]
+            else:
+                indexes = [int(m.group(1)) for m in _SHARED_STRING_CELL.finditer(xlsx.read(part))]
+                max_string = max(indexes, default=-1)
+            digest = hashlib.sha1(f"{info.CRC:08x}:{info.file_size}".encode())
+            if max_string >= 0 and shared_strings is not None:
+                if string_ends is None:
+                    strings = xlsx.read(shared_strings)
+                    string_ends = [m.end() for m in _SHARED_STRING_END.finditer(strings)]
+                digest.update(strings[:string_ends[min(max_string, len(string_ends) - 1)]])
+            out[name] = {
+                "fingerprint": digest.hexdigest(),
+                "part_crc": info.CRC,
+                "part_size": info.file_size,
+                "max_string": max_string,
+            }
+    return out
+
+
+def period_codes(values):
+    # Vectorized date -> integer fiscal-period code (2025-04-xx -> 202504); 0 where the
+    # cell is not a date. Accepts datetime cells as well as 'DD-MM-YYYY' text.
+    series = values if isinstance(values, pd.Series) else pd.Series(list(values), dtype=object)
+    if series.dtype.kind != "M":
+        series = pd.to_datetime(series, errors="coerce", format="mixed", dayfirst=True)
+    codes = series.dt.year * 100 + series.dt.month
+    return codes.fillna(0).astype(np.int64).to_numpy()
+
+
+def is_period_code(label):
+    return isinstance(label, (int, np.integer)) and 100001 <= label <= 999912 and 1 <= label % 100 <= 12
+
+
+def period_columns(df):
+    # Index from period code to column position for sheets whose month columns are headers
+    return {int(label): pos for pos, label in enumerate(df.columns) if is_period_code(label)}
+
+
+def normalize_periods(df):
+    # Replace the 'Month' column and any date-valued column headers with period codes
+    df = df.copy()
+    month_col = next((label for label in df.columns if isinstance(label, str) and label.strip() == "Month"), None)
+    if month_col is not None:
+        df[month_col] = period_codes(df[month_col])
+    if any(isinstance(label, datetime.datetime) for label in df.columns):
+        df.columns = [label.year * 100 + label.month if isinstance(label, datetime.datetime) else label for label in df.columns]
+    return df
+
+
+def range_bounds(cell_range):
+    # "A1:N9" -> (9, 14), "A:X" -> (None, 24): last row and column count of a block
+    # anchored at A1; None means unbounded
+    if cell_range is None:
+        return None, None
+    last = cell_range.split(":")[-1]
+    letters = last.rstrip("0123456789")
+    return (int(last[len(letters):]) if last[len(letters):] else None), _column_index(letters)
+
+
+def _column_index(letters):
+    # 'A' -> 1, 'N' -> 14, 'AB' -> 28
+    index = 0
+    for ch in letters.upper():
+        index = index * 26 + ord(ch) - 64
+    return index
+
+
+def _plain_text(elem):
+    # Text of a shared or inline string: its <t>, or the <t> of each rich-text run
+    # (phonetic runs are skipped), as openpyxl reads it but without its rich-text objects
+    return "".join(
+        (child.text or "") if child.tag == f"{_MAIN_NS}t" else child.findtext(f"{_MAIN_NS}t", "")
+        for child in elem
+        if child.tag in (f"{_MAIN_NS}t", f"{_MAIN_NS}r")
+    )
+
+
+def _read_shared_strings(fh):
+    strings = []
+    for _, elem in ET.iterparse(fh):
+        if elem.tag == f"{_MAIN_NS}si":
+            strings.append(_plain_text(elem).replace("x005F_", ""))
+            elem.clear()
+    return strings
+
+
+def _number(text):
+    return float(text) if "." in text or "E" in text or "e" in text else int(text)
+
+
+class SheetReader:
+    """Streams cell values out of worksheet XML, decoding only a declared block.
+
+    The workbook's shared strings, date styles and epoch are read once per reader.
+    Values are converted the way read_excel does (integral numbers become ints,
+    date-styled numbers datetimes, errors NaN), and the rows are handed to the same
+    TextParser read_excel uses, so header and dtype handling match a full read.
+    """
+
+    def __init__(self, path=EXCEL_FILE):
+        # openpyxl is only needed when a sheet is actually parsed, not when serving the snapshot
+        from openpyxl.styles.stylesheet import Stylesheet
+        from openpyxl.utils.datetime import CALENDAR_MAC_1904, CALENDAR_WINDOWS_1900
+
+        self._xlsx = zipfile.ZipFile(path)
+        self._parts, strings_part, styles_part = _workbook_parts(self._xlsx)
+        self._strings_part = strings_part
+        self._strings = None
+        styles = Stylesheet.from_tree(ET.fromstring(self._xlsx.read(styles_part))) if styles_part else None
+        self._date_styles = styles.date_formats if styles else set()
+        self._timedelta_styles = styles.timedelta_formats if styles else set()
+        workbook_pr = ET.fromstring(self._xlsx.read("xl/workbook.xml")).find(f"{_MAIN_NS}workbookPr")
+        date1904 = workbook_pr is not None and workbook_pr.get("date1904", "0").lower() in ("1", "true")
+        self._epoch = CALENDAR_MAC_1904 if date1904 else CALENDAR_WINDOWS_1900
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._xlsx.close()
+
+    @property
+    def sheet_names(self):
+        return list(self._parts)
+
+    def _shared_strings(self):
+        if self._strings is None:
+            self._strings = []
+            if self._strings_part is not None:
+                with self._xlsx.open(self._strings_part) as fh:
+                    self._strings = _read_shared_strings(fh)
+        return self._strings
+
+    def _value(self, cell):
+        kind = cell.get("t", "n")
+        if kind == "inlineStr":
+            child = cell.find(f"{_MAIN_NS}is")
+            return _plain_text(child) if child is not None else ""
+        text = cell.findtext(f"{_MAIN_NS}v")
+        if not text:
+            return ""
+        if kind == "n":
+            value = _number(text)
+            style = int(cell.get("s", 0))
+            if style in self._date_styles:
+                from openpyxl.utils.datetime import from_excel
+
+                try:
+                    return from_excel(value, self._epoch, timedelta=style in self._timedelta_styles)
+                except (OverflowError, ValueError):
+                    return np.nan
+            return value if isinstance(value, int) or not value.is_integer() else int(value)
+        if kind == "s":
+            return self._shared_strings()[int(text)]
+        if kind == "b":
+            return bool(int(text))
+        if kind == "e":
+            return np.nan
+        if kind == "d":
+            return datetime.datetime.fromisoformat(text)
+        return text
+
+    def rows(self, name, cell_range=None):
+        """Cell values of one sheet's block, row by row; empty cells are ''."""
+        max_row, max_col = range_bounds(cell_range)
+        rows, last_with_data, row_number, wider = [], -1, 0, False
+        with self._xlsx.open(self._parts[name]) as fh:
+            sheet_data = None
+            for event, elem in ET.iterparse(fh, events=("start", "end")):
+                if event == "start":
+                    if elem.tag == f"{_MAIN_NS}sheetData":
+                        sheet_data = elem
+                    elif elem.tag == f"{_MAIN_NS}row":
+                        row_number = int(elem.get("r", row_number + 1))
+                        if max_row is not None and row_number > max_row:
+                            break
+                    continue
+                if elem.tag != f"{_MAIN_NS}row":
+                    continue
+                values, col = [], 0
+                for cell in elem.iter(f"{_MAIN_NS}c"):
+                    ref = cell.get("r")
+                    col = _column_index(ref.rstrip("0123456789")) if ref else col + 1
+                    if max_col is not None and col > max_col:
+                        # Not decoded; only noted so the block is as wide as a full read would be
+                        if cell.find(f"{_MAIN_NS}v") is not None or cell.find(f"{_MAIN_NS}is") is not None:
+                            wider = True
+                        continue
+                    value = self._value(cell)
+                    if value != "":
+                        values.extend([""] * (col - 1 - len(values)))
+                        values.append(value)
+                # Rows absent from the XML are empty rows, as in openpyxl
+                rows.extend([] for _ in range(row_number - 1 - len(rows)))
+                rows.append(values)
+                if values:
+                    last_with_data = row_number - 1
+                # Processed rows are dropped so memory stays flat on long sheets
+                sheet_data.clear()
+        rows = rows[:last_with_data + 1]
+        width = max((len(r) for r in rows), default=0)
+        if wider and rows:
+            width = max_col
+        return [r + [""] * (width - len(r)) for r in rows]
+
+    def read(self, name, header=0, cell_range=None):
+        data = self.rows(name, cell_range)
+        if not data:
+            return pd.DataFrame()
+        return TextParser(data, header=header, skip_blank_lines=False).read()
+
+
+def parse_workers(value=None):
+    # Worker count from the argument or PROFITABILITY_PARSE_WORKERS; 1 means serial
+    if value is None:
+        value = os.environ.get(PARSE_WORKERS_ENV, "1")
+    if isinstance(value, str):
+        value = value.strip().lower()
+        value = (os.cpu_count() or 1) if value == "auto" else int(value or 1)
+    return max(int(value), 1)
+
+
+def _parse_sheet(reader, name, header):
+    return normalize_periods(reader.read(name, header, sheet_range(name)))
+
+
+def _to_columns(df):
+    # Compact columnar form sent back from a worker: the labels plus one numpy array per
+    # column, so typed columns cross the process boundary as raw buffers
+    return list(df.columns), [series.to_numpy() for _, series in df.items()]
+
+
+def _from_columns(columns):
+    labels, arrays = columns
+    df = pd.DataFrame(dict(enumerate(arrays)), copy=False)
+    df.columns = pd.Index(labels)
+    return df
+
+
+def _parse_sheet_worker(path, name, header):
+    # Runs in a pool process; each worker opens its own handle on the workbook
+    with SheetReader(path) as reader:
+        return _to_columns(_parse_sheet(reader, name, header))
+
+
+def _load_serial(path, sheet_headers):
+    with SheetReader(path) as reader:
+        available = set(reader.sheet_names)
+        return {
+            name: _parse_sheet(reader, name, header)
+            for name, header in sheet_headers.items()
+            if name in available
+        }
+
+
+def _sheet_sizes(path, sheet_headers):
+    # Uncompressed worksheet bytes per requested sheet present in the workbook
+    with zipfile.ZipFile(path) as xlsx:
+        parts = _workbook_parts(xlsx)[0]
+        return {name: xlsx.getinfo(parts[name]).file_size for name in sheet_headers if parts.get(name)}
+
+
+def parallel_min_bytes(value=None):
+    if value is None:
+        value = os.environ.get(PARALLEL_MIN_MB_ENV) or PARALLEL_MIN_MB
+    return int(float(value) * 1024 * 1024)
+
+
+def _load_parallel(path, sheet_headers, sizes, workers):
+    if not sizes:
+        return {}
+    # Biggest sheets first so one large sheet does not start last and set the wall time
+    order = sorted(sizes, key=sizes.get, reverse=True)
+    # spawn, not fork: the dashboard process runs watcher and server threads
+    context = multiprocessing.get_context("spawn")
+    with concurrent.futures.ProcessPoolExecutor(min(workers, len(order)), mp_context=context) as pool:
+        futures = {name: pool.submit(_parse_sheet_worker, path, name, sheet_headers[name]) for name in order}
+        parsed = {name: _from_columns(future.result()) for name, future in futures.items()}
+    return {name: parsed[name] for name in sheet_headers if name in parsed}
+
+
+def load_sheets(path=EXCEL_FILE, headers=None, workers=None):
+    """Parse every required sheet of the workbook.
+
+    `headers` maps sheet name -> header row and defaults to every sheet the layout
+    registry finds in the workbook (see sheet_headers). Each sheet is streamed by
+    SheetReader, limited to its block in SHEET_LAYOUTS.
+    Serially, all sheets come from one open handle. With more than one worker (argument
+    or PROFITABILITY_PARSE_WORKERS) and at least PARALLEL_MIN_MB of worksheet XML, the
+    sheets are parsed concurrently in a process pool; if the pool cannot be started or
+    breaks, loading falls back to the serial path.
+    Sheets missing from the workbook are left out so callers can report them individually.
+    """
+    if headers is None:
+        headers = sheet_headers(workbook_sheet_names(path))
+    workers = parse_workers(workers)
+    if workers > 1 and len(headers) > 1:
+        sizes = _sheet_sizes(path, headers)
+        if len(sizes) > 1 and sum(sizes.values()) >= parallel_min_bytes():
+            try:
+                return _load_parallel(path, headers, sizes, workers)
+            except (OSError, concurrent.futures.process.BrokenProcessPool):
+                pass
+    return _load_serial(path, headers)
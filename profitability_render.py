@@ -0,0 +1,191 @@
+import html
+import json
+
+import numpy as np
+import pandas as pd
+
+from profitability_engine import CHANGE_PCT, DOMAINS, GROSS_PROFIT, NET_PROFIT, NET_PROFIT_PCT, SALES, TOTAL
+
+# Render-edge helpers: the P&L stays numeric until it is turned into display text here.
+# Plotly is imported inside the figure builders, so a cold start that only shows tables
+# never loads it.
+
+
+def format_indian(values):
+    # Vectorized Indian-lakh grouping over an array of any shape: 12345678 -> '1,23,45,678'.
+    # Amounts are rounded to whole rupees; NaN becomes an empty string.
+    arr = np.asarray(values, dtype=float)
+    missing = np.isnan(arr)
+    n = np.rint(np.where(missing, 0.0, arr)).astype(np.int64)
+    negative = n < 0
+    n = np.abs(n)
+    text = np.char.mod("%d", n % 1000)
+    rest = n // 1000
+    text = np.where(rest > 0, np.char.zfill(text, 3), text)
+    while np.any(rest > 0):
+        active = rest > 0
+        group = np.char.mod("%d", rest % 100)
+        rest = rest // 100
+        group = np.where(rest > 0, np.char.zfill(group, 2), group)
+        text = np.where(active, np.char.add(np.char.add(group, ","), text), text)
+    text = np.where(negative, np.char.add("-", text), text)
+    return np.where(missing, "", text).astype(object)
+
+
+def format_percent(values):
+    # 'x.xx%'; NaN becomes an empty string
+    arr = np.asarray(values, dtype=float)
+    text = np.char.add(np.char.mod("%.2f", arr), "%").astype(object)
+    return np.where(np.isnan(arr), "", text).astype(object)
+
+
+def format_pnl_table(pnl):
+    # Numeric P&L -> display table: Indian-grouped amounts, 'x.xx%' for the Net Profit % row
+    body = pnl.to_numpy(dtype=float)
+    text = format_indian(body)
+    is_pct = np.asarray(pnl.index == NET_PROFIT_PCT)
+    if is_pct.any():
+        text[is_pct] = format_percent(body[is_pct])
+    tbl = pd.DataFrame(text, columns=pnl.columns)
+    tbl.insert(0, "Particulars", list(pnl.index))
+    return tbl
+
+
+# The P&L table is emitted straight from these precompiled fragments instead of a pandas
+# Styler: key rows get a CSS class rather than per-cell inline styles, so the markup
+# grows by one short <tr> per expense head.
+TABLE_STYLE = """<style type="text/css">
+table.pnl-table { border-collapse: collapse; border: 1px solid #ccc; border-radius: 5px; }
+table.pnl-table th { font-size: 16px; text-align: center; }
+table.pnl-table td { padding: 5px; }
+table.pnl-table tr:hover { background-color: #f0f0f0; }
+table.pnl-table tr:nth-child(even) { background-color: #f9f9f9; }
+table.pnl-table tr.pnl-sales td { font-weight: bold; color: #174ea6; background-color: #ffe066; }
+table.pnl-table tr.pnl-gross-profit td { font-weight: bold; color: #0b8043; background-color: #b7e4c7; }
+table.pnl-table tr.pnl-net-profit td { font-weight: bold; color: #b31412; background-color: #f4978e; }
+</style>
+"""
+# Highlighted rows, matched on the stripped, lower-cased Particulars label
+KEY_ROW_CLASSES = {"sales": "pnl-sales", "gross profit": "pnl-gross-profit", "net profit": "pnl-net-profit"}
+_TABLE = '<table class="pnl-table">\n<thead>\n<tr><th>&nbsp;</th>{header}</tr>\n</thead>\n<tbody>\n{rows}</tbody>\n</table>\n'
+_ROW = '<tr{cls}><th>{index}</th>{cells}</tr>\n'
+
+
+def _cells(tag, values):
+    return "".join(f"<{tag}>{html.escape(str(v))}</{tag}>" for v in values)
+
+
+def format_comparison_table(comparison, column=TOTAL):
+    # One column of a compare_pnl frame -> display table: the two years, Change and
+    # Change % side by side per line; the Net Profit % row stays in percent throughout
+    sub = comparison[column]
+    body = sub.to_numpy(dtype=float)
+    text = format_indian(body)
+    is_change_pct = np.asarray(sub.columns == CHANGE_PCT)
+    text[:, is_change_pct] = format_percent(body[:, is_change_pct])
+    is_pct = np.asarray(sub.index == NET_PROFIT_PCT)
+    if is_pct.any():
+        text[np.ix_(is_pct, ~is_change_pct)] = format_percent(body[np.ix_(is_pct, ~is_change_pct)])
+    tbl = pd.DataFrame(text, columns=sub.columns)
+    tbl.insert(0, "Particulars", list(sub.index))
+    return tbl
+
+
+def highlight_key_rows(pnl):
+    # Numeric P&L -> HTML table with the Sales / Gross Profit / Net Profit rows highlighted
+    return _html_table(format_pnl_table(pnl))
+
+
+def comparison_table(comparison, column=TOTAL):
+    # compare_pnl frame -> HTML table for one domain (or Total), key rows highlighted
+    return _html_table(format_comparison_table(comparison, column))
+
+
+def _html_table(df):
+    rows = []
+    for index, values in enumerate(df.itertuples(index=False, name=None)):
+        cls = KEY_ROW_CLASSES.get(str(values[0]).strip().lower())
+        rows.append(_ROW.format(cls=f' class="{cls}"' if cls else "", index=index, cells=_cells("td", values)))
+    return TABLE_STYLE + _TABLE.format(header=_cells("th", df.columns), rows="".join(rows))
+
+
+def format_lakhs(values):
+    # Bar labels in lakhs ('12.34L'); zero bars get no label
+    arr = np.asarray(values, dtype=float)
+    return np.where(arr != 0, np.char.add(np.char.mod("%.2f", arr / 1e5), "L"), "").tolist()
+
+
+def domain_bar(pnl, chart_title):
+    # Grouped bar of Sales / Gross Profit / Net Profit by domain
+    import plotly.graph_objects as go
+
+    domain_cols = DOMAINS
+    sales_vals = pnl.loc[SALES, domain_cols].to_numpy()
+    gross_profit_vals = pnl.loc[GROSS_PROFIT, domain_cols].to_numpy()
+    net_profit_vals = pnl.loc[NET_PROFIT, domain_cols].to_numpy()
+
+    fig = go.Figure(data=[
+        go.Bar(name='Sales', x=domain_cols, y=sales_vals, marker_color='#174ea6', text=format_lakhs(sales_vals), textposition='outside'),
+        go.Bar(name='Gross Profit', x=domain_cols, y=gross_profit_vals, marker_color='#0b8043', text=format_lakhs(gross_profit_vals), textposition='outside'),
+        go.Bar(name='Net Profit', x=domain_cols, y=net_profit_vals, marker_color='#b31412', text=format_lakhs(net_profit_vals), textposition='outside')
+    ])
+    fig.update_layout(
+        barmode='group',
+        title=f'{chart_title}: Sales, Gross Profit, and Net Profit by Domain',
+        xaxis_title='Domain',
+        yaxis_title='Amount (INR)',
+        legend_title='Metric',
+        template='plotly_white',
+        height=500
+    )
+    return fig
+
+
+def _domain_pie(values, title, palette):
+    # `palette` names a plotly qualitative colour sequence
+    import plotly.express as px
+
+    fig = px.pie(
+        names=DOMAINS,
+        values=values,
+        title=title,
+        color_discrete_sequence=getattr(px.colors.qualitative, palette),
+        hole=0.3
+    )
+    fig.update_traces(textposition='inside', textinfo='percent+label', textfont_size=18)
+    fig.update_layout(title_font_size=22)
+    return fig
+
+
+def sales_pie(pnl, chart_title=None):
+    return _domain_pie(pnl.loc[SALES, DOMAINS].to_numpy(), 'Sales by Domain', 'Set3')
+
+
+def net_profit_pie(pnl, chart_title=None):
+    return _domain_pie(pnl.loc[NET_PROFIT, DOMAINS].to_numpy(), 'Net Profit by Domain', 'Set1')
+
+
+# Chart tab label -> figure builder(pnl, chart_title); the dashboard builds one per open tab
+CHARTS = {
+    "Sales, Gross Profit & Net Profit": domain_bar,
+    "Sales by Domain": sales_pie,
+    "Net Profit by Domain": net_profit_pie,
+}
+
+
+def figure_json(fig):
+    # The spec the browser receives; this string is what the result cache holds per chart
+    return fig.to_json(validate=False)
+
+
+def figure_from_json(spec):
+    # Figure for st.plotly_chart from a cached spec. The spec came from a validated figure,
+    # so validation (most of the cost of rebuilding a figure from a dict) is skipped.
+    import plotly.graph_objects as go
+
+    return go.Figure(json.loads(spec), _validate=False)
+
+
+def domain_figures(pnl, chart_title):
+    # All three charts at once: the grouped bar plus the Sales and Net Profit pies
+    return tuple(build(pnl, chart_title) for build in CHARTS.values())
@@ -0,0 +1,259 @@
+import datetime
+import hashlib
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from profitability_loader import (
+    EXCEL_FILE, SHEET_LAYOUTS, load_sheets, sheet_fingerprints, sheet_headers, sheet_layout, sheet_range, workbook_sheet_names,
+)
+
+# Columnar copy of the sheets the dashboard reads: one uncompressed Arrow IPC file per
+# sheet plus a manifest. Files are memory-mapped on load, so numeric columns are read
+# without copying and several server processes share the same pages. The manifest keeps
+# each sheet's fingerprint inside the xlsx, so after an edit only the changed sheets are
+# parsed again.
+SNAPSHOT_DIRNAME = ".profitability_snapshot"
+MANIFEST = "manifest.json"
+SNAPSHOT_VERSION = 4
+
+# Arrow type used for each kind of cell found in a mixed object column
+_CELL_TYPES = {
+    "bool": pa.bool_(),
+    "int": pa.int64(),
+    "float": pa.float64(),
+    "str": pa.string(),
+    "datetime": pa.timestamp("us"),
+}
+
+
+def snapshot_dir(path=EXCEL_FILE):
+    return os.path.join(os.path.dirname(os.path.abspath(path)), SNAPSHOT_DIRNAME)
+
+
+def _source_stat(path):
+    st = os.stat(path)
+    return {"mtime_ns": st.st_mtime_ns, "size": st.st_size}
+
+
+def _encode_label(label):
+    if isinstance(label, datetime.datetime):
+        return {"t": "datetime", "v": label.isoformat()}
+    if isinstance(label, (int, np.integer)):
+        return {"t": "int", "v": int(label)}
+    return {"t": "str", "v": str(label)}
+
+
+def _decode_label(enc):
+    if enc["t"] == "datetime":
+        return datetime.datetime.fromisoformat(enc["v"])
+    return enc["v"]
+
+
+def _cell_kind(value):
+    if isinstance(value, (bool, np.bool_)):
+        return "bool"
+    if isinstance(value, (int, np.integer)):
+        return "int"
+    if isinstance(value, (float, np.floating)):
+        return "float"
+    if isinstance(value, datetime.datetime):
+        return "datetime"
+    return "str"
+
+
+def _encode_column(pos, series):
+    # Typed columns map straight onto Arrow; floats keep NaN as a value (not a null) so
+    # they convert back to numpy without a copy
+    if series.dtype != object:
+        if series.dtype.kind in "fiub":
+            return "plain", [(str(pos), pa.array(series.to_numpy()))]
+        return "plain", [(str(pos), pa.array(series, from_pandas=True))]
+    values = series.to_numpy()
+    present = pd.notna(values)
+    kinds = np.array([_cell_kind(v) if p else "" for v, p in zip(values, present)], dtype=object)
+    found = {k for k in kinds if k}
+    if found == {"str"}:
+        return "plain", [(str(pos), pa.array(values, type=pa.string(), from_pandas=True))]
+    # Mixed cells (e.g. labels and amounts in one column) are split into one typed
+    # sub-column per cell type and stitched back together on load
+    parts = []
+    for kind in sorted(found):
+        mask = kinds == kind
+        data = [v if m else None for v, m in zip(values, mask)]
+        if kind == "str":
+            data = [None if v is None else str(v) for v in data]
+        parts.append((f"{pos}:{kind}", pa.array(data, type=_CELL_TYPES[kind])))
+    return "mixed", parts
+
+
+def _write_sheet(df, file_path):
+    arrays, names, columns = [], [], []
+    for pos, (label, series) in enumerate(df.items()):
+        encoding, parts = _encode_column(pos, series)
+        columns.append({"label": _encode_label(label), "encoding": encoding, "parts": [n for n, _ in parts]})
+        for name, arr in parts:
+            names.append(name)
+            arrays.append(arr)
+    table = pa.Table.from_arrays(arrays, names=names)
+    tmp = f"{file_path}.{os.getpid()}.tmp"
+    with pa.OSFile(tmp, "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp, file_path)
+    return {"rows": len(df), "columns": columns}
+
+
+def _sheet_file(name, fingerprint=None):
+    # Named by sheet and content, never rewritten in place: a changed sheet gets a new
+    # file, so a process still holding the previous manifest keeps reading matching files
+    # (already mapped ones survive the cleanup pass). Without a fingerprint the name is unique.
+    content = fingerprint or os.urandom(8).hex()
+    key = f"{name}\0{content}\0{SNAPSHOT_VERSION}\0{sheet_layout(name)}"
+    return f"sheet_{hashlib.sha1(key.encode()).hexdigest()[:16]}.arrow"
+
+
+def write_snapshot(path=EXCEL_FILE, sheets=None, fingerprints=None, reuse=None, source=None):
+    # Convert the workbook (or already parsed sheets) into the on-disk snapshot.
+    # `reuse` maps sheet names to manifest entries whose files are still current;
+    # `source` is the workbook stat taken before `sheets` were read.
+    stat = source or _source_stat(path)
+    if sheets is None:
+        sheets = load_sheets(path)
+    if fingerprints is None:
+        fingerprints = sheet_fingerprints(path, sheets)
+    reuse = reuse or {}
+    out_dir = snapshot_dir(path)
+    os.makedirs(out_dir, exist_ok=True)
+    manifest = {"version": SNAPSHOT_VERSION, "source": stat, "headers": _headers_key(), "sheets": {}}
+    for name, df in sheets.items():
+        if name in reuse:
+            manifest["sheets"][name] = reuse[name]
+            continue
+        file_name = _sheet_file(name, fingerprints.get(name, {}).get("fingerprint"))
+        meta = _write_sheet(df, os.path.join(out_dir, file_name))
+        manifest["sheets"][name] = {"file": file_name, "header": sheet_layout(name)[0], "range": sheet_range(name), **fingerprints.get(name, {}), **meta}
+    tmp = os.path.join(out_dir, f"{MANIFEST}.{os.getpid()}.tmp")
+    with open(tmp, "w") as fh:
+        json.dump(manifest, fh)
+    os.replace(tmp, os.path.join(out_dir, MANIFEST))
+    # Drop sheet files the new manifest no longer references (renamed sheets, older layouts)
+    current = {meta["file"] for meta in manifest["sheets"].values()}
+    for entry in os.listdir(out_dir):
+        if entry.endswith(".arrow") and entry not in current:
+            os.remove(os.path.join(out_dir, entry))
+    return manifest
+
+
+def _headers_key():
+    # How each sheet is read: header row and extracted block per registered name or
+    # template; a change invalidates the snapshot
+    return {name: list(layout) for name, layout in SHEET_LAYOUTS.items()}
+
+
+def read_manifest(path=EXCEL_FILE):
+    try:
+        with open(os.path.join(snapshot_dir(path), MANIFEST)) as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return None
+
+
+def is_fresh(manifest, path=EXCEL_FILE):
+    return (
+        manifest is not None
+        and manifest.get("version") == SNAPSHOT_VERSION
+        and manifest.get("headers") == _headers_key()
+        and manifest.get("source") == _source_stat(path)
+    )
+
+
+def _read_sheet(file_path, meta):
+    # Memory-map the IPC file; numeric buffers are handed to pandas without copying
+    with pa.memory_map(file_path, "r") as source:
+        table = pa.ipc.open_file(source).read_all()
+    n = meta["rows"]
+    data, labels = {}, []
+    for pos, col in enumerate(meta["columns"]):
+        labels.append(_decode_label(col["label"]))
+        if col["encoding"] == "plain":
+            column = table.column(col["parts"][0])
+            series = column.to_pandas(split_blocks=True)
+            # Arrow hands back None for missing text; read_excel uses NaN
+            data[pos] = series.fillna(np.nan) if pa.types.is_string(column.type) else series
+            continue
+        values = np.full(n, np.nan, dtype=object)
+        for part in col["parts"]:
+            for i, v in enumerate(table.column(part).to_pylist()):
+                if v is not None:
+                    values[i] = v
+        data[pos] = values
+    df = pd.DataFrame(data, copy=False)
+    df.columns = pd.Index(labels)
+    return df
+
+
+def read_snapshot(manifest, path=EXCEL_FILE):
+    base = snapshot_dir(path)
+    return {name: _read_sheet(os.path.join(base, meta["file"]), meta) for name, meta in manifest["sheets"].items()}
+
+
+def sheet_versions(manifest):
+    # Sheet name -> content fingerprint, as used by build_cube to skip unchanged components
+    return {name: meta.get("fingerprint") for name, meta in manifest["sheets"].items()}
+
+
+def load_snapshot_versions(path=EXCEL_FILE):
+    """Sheets plus their per-sheet fingerprints, refreshing only what changed in the xlsx.
+
+    An untouched workbook is served straight from the snapshot. Otherwise each sheet's
+    fingerprint is compared with the manifest: matching sheets are read from their
+    Arrow files and only the rest are parsed from the workbook (and rewritten).
+    """
+    manifest = read_manifest(path)
+    if is_fresh(manifest, path):
+        try:
+            return read_snapshot(manifest, path), sheet_versions(manifest)
+        except (OSError, pa.ArrowInvalid):
+            # Another process swapped in a newer snapshot and removed these files meanwhile
+            manifest = read_manifest(path)
+    source = _source_stat(path)
+    known = manifest["sheets"] if manifest is not None and manifest.get("version") == SNAPSHOT_VERSION else {}
+    headers = sheet_headers(workbook_sheet_names(path))
+    fingerprints = sheet_fingerprints(path, headers, known)
+    reuse = {
+        name: meta for name, meta in known.items()
+        if name in fingerprints
+        and meta.get("fingerprint") == fingerprints[name]["fingerprint"]
+        and meta.get("header") == headers[name]
+        and meta.get("range") == sheet_range(name)
+    }
+    try:
+        sheets = read_snapshot({"sheets": reuse}, path)
+    except (OSError, pa.ArrowInvalid):
+        reuse, sheets = {}, {}
+    changed = {name: headers[name] for name in fingerprints if name not in reuse}
+    if changed:
+        sheets.update(load_sheets(path, changed))
+    sheets = {name: sheets[name] for name in headers if name in sheets}
+    try:
+        write_snapshot(path, sheets, fingerprints, reuse, source)
+    except OSError:
+        # Read-only deployments still work, they just parse the xlsx each cold start
+        pass
+    return sheets, {name: fp["fingerprint"] for name, fp in fingerprints.items()}
+
+
+def load_snapshot(path=EXCEL_FILE):
+    # Serve sheets from the snapshot, regenerating the stale parts first when the workbook changed
+    return load_snapshot_versions(path)[0]
+
+
+if __name__ == "__main__":
+    target = sys.argv[1] if len(sys.argv) > 1 else EXCEL_FILE
+    written = write_snapshot(target)
+    print(f"Wrote {len(written['sheets'])} sheets to {snapshot_dir(target)}")
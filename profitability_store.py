@@ -0,0 +1,313 @@
+import argparse
+import contextlib
+import hashlib
+import json
+import os
+import sqlite3
+
+import numpy as np
+
+from profitability_engine import (
+    BASE_LINES, DEFERRED_REVENUE, DOMAINS, EXPENSES, MONTHS, PURCHASE, SALARY, SALES, TNS_EXPENSES,
+    PnLCube, assemble_pnl, cube_sources, deferred_revenue_rows, expense_rows, fiscal_periods, fiscal_positions, fiscal_years,
+    fy_suffix, purchase_rows, salary_rows, sales_rows, tns_rows,
+)
+from profitability_loader import EXCEL_FILE, file_fingerprint
+from profitability_snapshot import load_snapshot_versions
+
+# Indexed SQLite copy of the workbook: every sheet the P&L reads, normalized into fact rows
+# keyed by fiscal year, integer period code and domain. `python -m profitability_store`
+# ingests the workbook into a new file and swaps it in atomically, so any number of
+# processes can keep reading the previous version (read-only) while it is rebuilt.
+# `--append` instead updates the store in place, rewriting only the periods that changed.
+# Setting PROFITABILITY_STORE to the database path makes the dashboard read from it.
+STORE_FILE = "profitability.sqlite"
+STORE_ENV = "PROFITABILITY_STORE"
+STORE_VERSION = 3
+
+SCHEMA = """
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+-- One row per (fy, cube component): source sheet, its fingerprint and any warnings
+CREATE TABLE sources (
+    fy TEXT NOT NULL, component TEXT NOT NULL, sheet TEXT NOT NULL, fingerprint TEXT,
+    ok INTEGER NOT NULL, warnings TEXT NOT NULL, PRIMARY KEY (fy, component)
+);
+-- Digest of each component's fact rows per period; appending compares against these, so a
+-- changed sheet costs at most twelve digests per year and back-dated corrections are caught
+CREATE TABLE period_digests (
+    fy TEXT NOT NULL, component TEXT NOT NULL, period INTEGER NOT NULL, digest TEXT NOT NULL,
+    PRIMARY KEY (fy, component, period)
+);
+-- Sales, Deferred Revenue, Purchase, Salary and TNS amounts per source row, month and domain
+CREATE TABLE line_items (fy TEXT NOT NULL, period INTEGER NOT NULL, domain TEXT NOT NULL, line TEXT NOT NULL, amount REAL NOT NULL);
+-- Expense heads keep sheet order; their amounts are allocated to domains at query time
+CREATE TABLE expense_heads (fy TEXT NOT NULL, position INTEGER NOT NULL, head TEXT NOT NULL, PRIMARY KEY (fy, position));
+CREATE TABLE expense_items (fy TEXT NOT NULL, period INTEGER NOT NULL, head TEXT NOT NULL, amount REAL NOT NULL);
+-- (fy, period, domain) leads; line and amount ride along so aggregates never touch the table
+CREATE INDEX line_items_fy_period_domain ON line_items (fy, period, domain, line, amount);
+CREATE INDEX expense_items_fy_period ON expense_items (fy, period, head, amount);
+"""
+
+# Cube line -> row-level facts builder(sheet, fy) -> (month positions, rows x DOMAINS)
+ROW_FACTS = {
+    SALES: sales_rows,
+    DEFERRED_REVENUE: deferred_revenue_rows,
+    PURCHASE: purchase_rows,
+    SALARY: salary_rows,
+}
+
+
+def store_path(path=EXCEL_FILE):
+    return os.path.join(os.path.dirname(os.path.abspath(path)), STORE_FILE)
+
+
+def is_store(path):
+    return path.endswith((".sqlite", ".db"))
+
+
+def _line_items(fy, line, pos, amounts):
+    # Non-zero cells of a rows x DOMAINS block as (fy, period, domain, line, amount) rows
+    periods = np.asarray(fiscal_periods(fy))[pos]
+    rows, cols = np.nonzero(amounts)
+    return [(fy, int(p), DOMAINS[c], line, float(a)) for p, c, a in zip(periods[rows], cols, amounts[rows, cols])]
+
+
+def _expense_items(fy, df):
+    heads, head_pos, months, amounts = expense_rows(df, fy)
+    periods = np.asarray(fiscal_periods(fy))[months]
+    nonzero = amounts != 0
+    names = [str(h) for h in heads]
+    items = [(fy, int(p), names[h], float(a)) for p, h, a in zip(periods[nonzero], head_pos[nonzero], amounts[nonzero])]
+    return names, items
+
+
+def component_facts(sheets, fy, component):
+    """Fact rows of one cube component: (rows, expense heads or None, ok, warnings).
+
+    Rows are line_items tuples, or expense_items tuples for the Expenses component.
+    Mirrors build_cube: a broken TNS sheet is reported, not fatal.
+    """
+    df = sheets[cube_sources(fy)[component]] if component != TNS_EXPENSES else None
+    if component == EXPENSES:
+        heads, items = _expense_items(fy, df)
+        return items, heads, True, []
+    if component != TNS_EXPENSES:
+        return _line_items(fy, component, *ROW_FACTS[component](df, fy)), None, True, []
+    suffix = fy_suffix(fy)
+    try:
+        pos, allocated, coerced = tns_rows(sheets[cube_sources(fy)[TNS_EXPENSES]], fy)
+    except Exception as e:
+        return [], None, False, [f"Could not load TNS Expenses {suffix}: {e}"]
+    warnings = [f"TNS Expenses {suffix}: {coerced} non-numeric Amount/allocation cells counted as 0"] if coerced else []
+    return _line_items(fy, TNS_EXPENSES, pos, allocated), None, True, warnings
+
+
+def _by_period(rows):
+    out = {}
+    for row in rows:
+        out.setdefault(row[1], []).append(row)
+    return out
+
+
+def _digest(rows):
+    return hashlib.sha1(repr(rows).encode()).hexdigest()
+
+
+def _write_component(conn, fy, component, fingerprint, facts):
+    """Replace only the periods of one component whose fact rows are new, changed or gone.
+
+    Returns the periods that were rewritten. On an empty store every period is new.
+    """
+    rows, heads, ok, warnings = facts
+    periods = _by_period(rows)
+    digests = {period: _digest(items) for period, items in periods.items()}
+    known = dict(conn.execute("SELECT period, digest FROM period_digests WHERE fy = ? AND component = ?", (fy, component)))
+    changed = sorted(p for p, digest in digests.items() if known.get(p) != digest)
+    removed = sorted(set(known) - set(digests))
+    if component == EXPENSES:
+        table, match, extra = "expense_items", "", ()
+    else:
+        table, match, extra = "line_items", " AND line = ?", (component,)
+    placeholders = ", ".join("?" * len(next(iter(rows), ())))
+    for period in changed + removed:
+        conn.execute(f"DELETE FROM {table} WHERE fy = ? AND period = ?{match}", (fy, period) + extra)
+        conn.execute("DELETE FROM period_digests WHERE fy = ? AND component = ? AND period = ?", (fy, component, period))
+    for period in changed:
+        conn.executemany(f"INSERT INTO {table} VALUES ({placeholders})", periods[period])
+        conn.execute("INSERT INTO period_digests VALUES (?, ?, ?, ?)", (fy, component, period, digests[period]))
+    if heads is not None:
+        conn.execute("DELETE FROM expense_heads WHERE fy = ?", (fy,))
+        conn.executemany("INSERT INTO expense_heads VALUES (?, ?, ?)", [(fy, i, h) for i, h in enumerate(heads)])
+    conn.execute("INSERT OR REPLACE INTO sources VALUES (?, ?, ?, ?, ?, ?)", (
+        fy, component, cube_sources(fy)[component], fingerprint, int(ok), json.dumps(warnings)))
+    return changed + removed
+
+
+def _ingest(conn, path, sheets, versions, incremental):
+    # Per (fy, component): skip sheets whose fingerprint is unchanged, diff the rest by period
+    known = {}
+    if incremental:
+        known = {(fy, c): fp for fy, c, fp in conn.execute("SELECT fy, component, fingerprint FROM sources")}
+    updated = {}
+    years = fiscal_years(sheets)
+    # A fiscal year whose sheets are gone from the workbook leaves the store as well
+    for (fy,) in conn.execute("SELECT DISTINCT fy FROM sources").fetchall():
+        if fy not in years:
+            for table in ("sources", "period_digests", "line_items", "expense_heads", "expense_items"):
+                conn.execute(f"DELETE FROM {table} WHERE fy = ?", (fy,))
+            updated[(fy, None)] = []
+    for fy in years:
+        for component, sheet in cube_sources(fy).items():
+            fingerprint = versions.get(sheet)
+            if incremental and fingerprint is not None and known.get((fy, component)) == fingerprint:
+                continue
+            periods = _write_component(conn, fy, component, fingerprint, component_facts(sheets, fy, component))
+            if periods:
+                updated[(fy, component)] = periods
+    conn.executemany("INSERT OR REPLACE INTO meta VALUES (?, ?)", [
+        ("version", str(STORE_VERSION)),
+        ("workbook", os.path.abspath(path)),
+        ("fingerprint", file_fingerprint(path)),
+    ])
+    return updated
+
+
+def ingest(path=EXCEL_FILE, store=None):
+    """Load the workbook's P&L sheets into a fresh SQLite store and swap it in; returns its path."""
+    store = store or store_path(path)
+    sheets, versions = load_snapshot_versions(path)
+    tmp = f"{store}.{os.getpid()}.tmp"
+    if os.path.exists(tmp):
+        os.remove(tmp)
+    with contextlib.closing(sqlite3.connect(tmp)) as conn:
+        conn.executescript(SCHEMA)
+        _ingest(conn, path, sheets, versions, incremental=False)
+        conn.commit()
+    os.replace(tmp, store)
+    return store
+
+
+def append(path=EXCEL_FILE, store=None):
+    """Month-end refresh: write only the periods that are new or changed since the last ingest.
+
+    Sheets whose fingerprint matches the store's are skipped outright; for the rest, each
+    period's fact rows are compared by digest and only differing periods are deleted and
+    re-inserted, in one transaction (readers see the old or the new store, never a mix).
+    Returns {(fy, component): [periods rewritten]} (component None for a fiscal year that
+    was dropped from the workbook), or None when there was no store of
+    this version yet and it fell back to a full ingest.
+    """
+    store = store or store_path(path)
+    try:
+        connect(store).close()
+    except (sqlite3.Error, ValueError):
+        ingest(path, store)
+        return None
+    sheets, versions = load_snapshot_versions(path)
+    with contextlib.closing(sqlite3.connect(store, timeout=30)) as conn:
+        with conn:
+            return _ingest(conn, path, sheets, versions, incremental=True)
+
+
+def connect(store=STORE_FILE):
+    # Read-only connection; safe to hold from several processes at once
+    conn = sqlite3.connect(f"file:{os.path.abspath(store)}?mode=ro", uri=True, check_same_thread=False)
+    version = conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+    if version is None or int(version[0]) != STORE_VERSION:
+        conn.close()
+        raise ValueError(f"{store} was written by a different store version; run `python -m profitability_store` again")
+    return conn
+
+
+def fingerprint(conn):
+    # Content hash of the workbook the store was ingested from
+    return conn.execute("SELECT value FROM meta WHERE key = 'fingerprint'").fetchone()[0]
+
+
+def stored_fiscal_years(conn):
+    # Fiscal years held in the store, newest first
+    return [fy for (fy,) in conn.execute("SELECT DISTINCT fy FROM sources ORDER BY fy DESC")]
+
+
+def _period_filter(fy, start, end):
+    periods = fiscal_periods(fy)
+    return "fy = ? AND period BETWEEN ? AND ?", (fy, start or periods[0], end or periods[-1])
+
+
+def _sources(conn, fy):
+    rows = conn.execute("SELECT component, sheet, fingerprint, ok, warnings FROM sources WHERE fy = ?", (fy,)).fetchall()
+    issues = {component: json.loads(warnings) for component, _, _, _, warnings in rows if json.loads(warnings)}
+    has_tns = all(ok for component, _, _, ok, _ in rows if component == TNS_EXPENSES)
+    return has_tns, issues, {sheet: fp for _, sheet, fp, _, _ in rows}
+
+
+def _expense_heads(conn, fy):
+    return [head for (head,) in conn.execute("SELECT head FROM expense_heads WHERE fy = ? ORDER BY position", (fy,))]
+
+
+def load_cube(conn, fy):
+    """The month x line x domain cube for one fiscal year, from two grouped index scans."""
+    where, params = _period_filter(fy, None, None)
+    values = np.zeros((len(MONTHS), len(BASE_LINES), len(DOMAINS)))
+    rows = conn.execute(f"SELECT period, line, domain, SUM(amount) FROM line_items WHERE {where} GROUP BY period, line, domain", params).fetchall()
+    if rows:
+        periods, lines, domains, amounts = zip(*rows)
+        idx = (fiscal_positions(periods, fy), [BASE_LINES.index(l) for l in lines], [DOMAINS.index(d) for d in domains])
+        np.add.at(values, idx, amounts)
+    heads = _expense_heads(conn, fy)
+    expenses = np.zeros((len(MONTHS), len(heads)))
+    position = {head: i for i, head in enumerate(heads)}
+    rows = conn.execute(f"SELECT period, head, SUM(amount) FROM expense_items WHERE {where} GROUP BY period, head", params).fetchall()
+    if rows:
+        periods, names, amounts = zip(*rows)
+        np.add.at(expenses, (fiscal_positions(periods, fy), [position[h] for h in names]), amounts)
+    has_tns, issues, versions = _sources(conn, fy)
+    return PnLCube(fy, values, heads, expenses, has_tns, issues, versions)
+
+
+def query_pnl(conn, fy, start=None, end=None):
+    """Numeric P&L over any run of periods within a fiscal year (codes like 202504, inclusive).
+
+    Totals come straight from SQL aggregates over the (fy, period, domain) index, so a
+    quarter or year-to-date view costs the same as a single month.
+    """
+    where, params = _period_filter(fy, start, end)
+    base = np.zeros((len(BASE_LINES), len(DOMAINS)))
+    for line, domain, amount in conn.execute(f"SELECT line, domain, SUM(amount) FROM line_items WHERE {where} GROUP BY line, domain", params):
+        base[BASE_LINES.index(line), DOMAINS.index(domain)] = amount
+    heads = _expense_heads(conn, fy)
+    totals = np.zeros(len(heads))
+    position = {head: i for i, head in enumerate(heads)}
+    for head, amount in conn.execute(f"SELECT head, SUM(amount) FROM expense_items WHERE {where} GROUP BY head", params):
+        totals[position[head]] = amount
+    has_tns, issues, _ = _sources(conn, fy)
+    return assemble_pnl(base, heads, totals, has_tns, [msg for msgs in issues.values() for msg in msgs])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ingest the profitability workbook into the SQLite store.")
+    parser.add_argument("workbook", nargs="?", default=EXCEL_FILE)
+    parser.add_argument("store", nargs="?", help=f"database path (default: {STORE_FILE} next to the workbook)")
+    parser.add_argument("--append", action="store_true", help="only write periods that are new or changed")
+    args = parser.parse_args(argv)
+    store = args.store or store_path(args.workbook)
+    if args.append:
+        updated = append(args.workbook, store)
+        if updated is None:
+            print(f"No usable store yet; ingested everything into {store}")
+        else:
+            for (fy, component), periods in updated.items():
+                if component is None:
+                    print(f"FY {fy}: no longer in the workbook, removed")
+                else:
+                    print(f"FY {fy} {component}: rewrote periods {', '.join(map(str, periods))}")
+            print(f"Updated {len(updated)} components in {store}")
+        return
+    ingest(args.workbook, store)
+    with contextlib.closing(connect(store)) as conn:
+        counts = {table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] for table in ("line_items", "expense_items")}
+    print(f"Wrote {counts['line_items']} line items and {counts['expense_items']} expense items to {store}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+import contextlib
+import dataclasses
+import os
+import threading
+import time
+import zipfile
+
+from profitability_diagnostics import frame_size
+from profitability_engine import ALL_MONTHS, MONTHS, RANGES, build_cubes
+from profitability_loader import EXCEL_FILE, file_fingerprint
+from profitability_snapshot import load_snapshot_versions
+from profitability_store import connect, fingerprint as store_fingerprint, is_store, load_cube, stored_fiscal_years
+
+# Background pre-warming: a daemon thread polls the workbook and, once an edit has
+# settled, rebuilds sheets, cubes and every (fiscal year, month) P&L off the request
+# path. Readers always get the last complete WarmState; the swap is one assignment.
+POLL_SECONDS = 2.0
+# The workbook must keep the same mtime/size this long before it is read (Excel and
+# sync clients write in several steps)
+SETTLE_SECONDS = 2.0
+
+# Views computed up front; any other selection is one prefix-sum subtraction on the cube
+VIEWS = [ALL_MONTHS] + MONTHS + list(RANGES)
+
+
+@dataclasses.dataclass(frozen=True)
+class WarmState:
+    """Everything the dashboard needs for one workbook version, fully computed.
+
+    `cubes` maps each fiscal year found in the workbook to its cube, newest first.
+    `bytes_read` is what the build loaded: the sheet frames parsed or memory-mapped from
+    the snapshot, or the store file it queried.
+    """
+
+    source: tuple
+    fingerprint: str
+    sheets: dict
+    versions: dict
+    cubes: dict
+    pnls: dict
+    build_ms: float
+    bytes_read: int = 0
+
+    def pnl(self, fy, month=ALL_MONTHS):
+        pnl = self.pnls.get((fy, month))
+        return pnl if pnl is not None else self.cubes[fy].pnl(month)
+
+
+def _source(path):
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+
+def is_complete(path):
+    # A store is never read half written: a full ingest swaps in a new file and an append
+    # commits in one SQLite transaction, which readers see whole or not at all. The settle
+    # debounce then waits for the file (and its journal) to stop changing before reloading.
+    if is_store(path):
+        return os.path.exists(path)
+    # A partially written xlsx has no readable zip directory (it is written last)
+    try:
+        with zipfile.ZipFile(path) as xlsx:
+            return "xl/workbook.xml" in xlsx.namelist()
+    except (OSError, zipfile.BadZipFile):
+        return False
+
+
+def build_state(path=EXCEL_FILE, previous=None):
+    # Load (incrementally, via the snapshot) and compute every view for every fiscal year.
+    # `path` may also be a SQLite store, whose cubes come from indexed aggregate queries.
+    started = time.perf_counter()
+    source = _source(path)
+    if is_store(path):
+        with contextlib.closing(connect(path)) as conn:
+            fingerprint = store_fingerprint(conn)
+            cubes = {fy: load_cube(conn, fy) for fy in stored_fiscal_years(conn)}
+        pnls = {(fy, month): cube.pnl(month) for fy, cube in cubes.items() for month in VIEWS}
+        versions = {name: fp for cube in cubes.values() for name, fp in cube.versions.items()}
+        return WarmState(source, fingerprint, {}, versions, cubes, pnls, (time.perf_counter() - started) * 1000,
+                         os.path.getsize(path))
+    fingerprint = file_fingerprint(path)
+    sheets, versions = load_snapshot_versions(path)
+    cubes = build_cubes(sheets, versions, previous.cubes if previous else None) if "Sales" in sheets else {}
+    pnls = {(fy, month): cube.pnl(month) for fy, cube in cubes.items() for month in VIEWS}
+    return WarmState(source, fingerprint, sheets, versions, cubes, pnls, (time.perf_counter() - started) * 1000,
+                     sum(frame_size(df)[1] for df in sheets.values()))
+
+
+class WorkbookWatcher:
+    """Polls `path` and swaps in a freshly built WarmState whenever the file changes.
+
+    `refresh()` builds synchronously (used once at start-up); afterwards the thread
+    rebuilds only after the file's stat has been stable for `settle` seconds and the zip
+    is complete. A failed rebuild keeps serving the previous state and is kept in `error`.
+    """
+
+    def __init__(self, path=EXCEL_FILE, poll=POLL_SECONDS, settle=SETTLE_SECONDS):
+        self.path = path
+        self.poll = poll
+        self.settle = settle
+        self.error = None
+        self._state = None
+        self._lock = threading.Lock()
+        self._pending = None
+        self._failed = None
+        self._stop = threading.Event()
+        self._thread = None
+        # Bytes read by a synchronous refresh() that no request has logged yet; guarded by
+        # its own lock so reruns never wait on a rebuild holding `_lock`
+        self._unreported_bytes = 0
+        self._bytes_lock = threading.Lock()
+
+    def current(self):
+        return self._state
+
+    def refresh(self):
+        # Synchronous build on the caller's thread; its reads are reported by take_bytes_read()
+        return self._refresh(report=True)
+
+    def take_bytes_read(self):
+        # Bytes the caller's own refresh() read, once; 0 when it was served from a warm state
+        with self._bytes_lock:
+            nbytes, self._unreported_bytes = self._unreported_bytes, 0
+        return nbytes
+
+    def _refresh(self, report):
+        with self._lock:
+            state = self._state
+            if state is None or state.source != _source(self.path):
+                state = build_state(self.path, previous=state)
+                self._state = state
+                self.error = None
+                if report:
+                    with self._bytes_lock:
+                        self._unreported_bytes += state.bytes_read
+        return state
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="profitability-watcher", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _settled(self, source):
+        # Debounce: the same stat must be seen for `settle` seconds before it counts
+        now = time.monotonic()
+        if self._pending is None or self._pending[0] != source:
+            self._pending = (source, now)
+            return False
+        return now - self._pending[1] >= self.settle and is_complete(self.path)
+
+    def _run(self):
+        while not self._stop.wait(self.poll):
+            try:
+                source = _source(self.path)
+            except OSError:
+                continue
+            state = self._state
+            if (state is not None and state.source == source) or source == self._failed:
+                self._pending = None
+                continue
+            if not self._settled(source):
+                continue
+            try:
+                # Background rebuilds are off the request path; no run reports their reads
+                self._refresh(report=False)
+            except Exception as e:
+                # Retried once the file changes again
+                self.error = e
+                self._failed = source
+                self._pending = None
@@ -0,0 +1,48 @@
+import os
+import sys
+import time
+import zipfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+WORKBOOK = os.path.join(ROOT, "Profitability_CEOITBOX.xlsx")
+
+
+@pytest.fixture(scope="session")
+def sheets():
+    # The bundled workbook parsed once, serially, straight from the xlsx (no snapshot)
+    from profitability_loader import load_sheets
+
+    return load_sheets(WORKBOOK, workers=1)
+
+
+@pytest.fixture(scope="session")
+def cubes(sheets):
+    from profitability_engine import build_cubes
+
+    return build_cubes(sheets, workers=1)
+
+
+def edit_sheet(src, dst, name, old, new):
+    """Copy the workbook at `src` to `dst` with `old` replaced by `new` in one sheet's part.
+
+    Only that worksheet part changes; every other part is copied byte for byte, which
+    an openpyxl re-save would not do. The new file's mtime is moved a second past any
+    earlier copy at `dst`, so stat-based freshness checks always see the edit.
+    """
+    before = os.stat(dst).st_mtime_ns if os.path.exists(dst) else 0
+    from profitability_loader import _workbook_parts
+
+    with zipfile.ZipFile(src) as xlsx:
+        part = _workbook_parts(xlsx)[0][name]
+        data = xlsx.read(part)
+        assert data.count(old) == 1, f"{old!r} is not unique in {name}"
+        with zipfile.ZipFile(dst, "w", zipfile.ZIP_DEFLATED) as out:
+            for info in xlsx.infolist():
+                out.writestr(info, data.replace(old, new) if info.filename == part else xlsx.read(info))
+    mtime = max(time.time_ns(), before + 10**9)
+    os.utime(dst, ns=(mtime, mtime))
+    return str(dst)
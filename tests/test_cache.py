@@ -0,0 +1,36 @@
+import pandas as pd
+
+from profitability_cache import ResultCache, size_of
+
+
+def test_entries_are_sized_by_their_content():
+    assert size_of("x" * 100) == 100
+    df = pd.DataFrame({"a": range(10)})
+    assert size_of(df) == df.memory_usage(index=True, deep=True).sum()
+    assert size_of(("x" * 10, "y" * 5)) == 15
+
+
+def test_least_recently_used_entries_are_evicted_first():
+    cache = ResultCache(max_bytes=30)
+    for key in "abc":
+        cache.get_or_compute(key, lambda: key * 10)
+    cache.get_or_compute("a", lambda: "recomputed")  # hit: "a" becomes most recent
+    cache.get_or_compute("d", lambda: "d" * 10)
+    assert cache.get_or_compute("a", lambda: "recomputed") == "a" * 10
+    assert cache.get_or_compute("b", lambda: "recomputed") == "recomputed"
+    stats = cache.stats()
+    assert stats["bytes"] <= 30
+    assert (stats["hits"], stats["misses"], stats["evictions"]) == (2, 5, 2)
+
+
+def test_byte_accounting_follows_replacements_and_clear():
+    cache = ResultCache(max_bytes=100)
+    # Two sessions missing "a" at once: the one that finishes second replaces the first
+    cache.get_or_compute("a", lambda: cache.get_or_compute("a", lambda: "x" * 40) and "x" * 25)
+    cache.get_or_compute("b", lambda: "x" * 30)
+    assert cache.stats()["bytes"] == 55
+    # A value larger than the whole budget is returned but never stored
+    assert cache.get_or_compute("big", lambda: "x" * 101) == "x" * 101
+    assert cache.stats()["entries"] == 2
+    cache.clear()
+    assert cache.stats()["bytes"] == 0 and cache.stats()["entries"] == 0
@@ -0,0 +1,26 @@
+import json
+
+import pytest
+
+from profitability_diagnostics import latency_percentiles, tail_lines
+
+
+def test_tail_lines_across_block_boundaries(tmp_path):
+    path = tmp_path / "log.jsonl"
+    path.write_bytes(b"".join(b"line %d\n" % i for i in range(1000)))
+    assert tail_lines(path, 3, block=7) == [b"line 997", b"line 998", b"line 999"]
+    assert tail_lines(path, 5000, block=64) == [b"line %d" % i for i in range(1000)]
+    assert tail_lines(path, 0) == []
+
+
+def test_latency_percentiles_groups_the_tail_by_section(tmp_path):
+    path = tmp_path / "timings.jsonl"
+    records = [{"section": "page", "total_ms": 1000.0}] * 10
+    records += [{"section": "page" if i % 2 else "2025-26", "total_ms": float(i)} for i in range(10)]
+    path.write_text("".join(json.dumps(r) + "\n" for r in records) + "not json\n")
+    latency = latency_percentiles(path, last=11)
+    assert set(latency) == {"page", "2025-26"}
+    assert latency["page"]["runs"] == 5
+    assert latency["page"]["p50"] == pytest.approx(5.0)
+    assert latency["2025-26"]["p95"] == pytest.approx(7.6)
+    assert latency_percentiles(tmp_path / "missing.jsonl") == {}
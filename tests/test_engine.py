@@ -0,0 +1,101 @@
+import shutil
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import profitability_snapshot
+from conftest import WORKBOOK, edit_sheet
+from profitability_diagnostics import recording
+from profitability_engine import (
+    ALL_MONTHS, CHANGE, CHANGE_PCT, GROSS_PROFIT, MONTHS, NET_PROFIT, NET_PROFIT_PCT, SALES, TNS_EXPENSES, TOTAL,
+    build_cubes, compare_pnl, fiscal_years,
+)
+
+
+def test_discovers_both_fiscal_years(sheets):
+    assert fiscal_years(sheets) == ["2025-26", "2024-25"]
+
+
+def test_year_to_date_follows_booked_sales(cubes):
+    # Expenses 25-26 carries amortized license fees through March; only Apr-Jun are booked
+    assert cubes["2025-26"].year_to_date() == ("April", "June")
+    assert cubes["2024-25"].year_to_date() == ("April", "March")
+
+
+def test_range_matches_sum_of_months(cubes):
+    cube = cubes["2024-25"]
+    q3 = cube.pnl("Q3").loc[SALES].to_numpy()
+    months = sum(cube.pnl(month).loc[SALES].to_numpy() for month in MONTHS[6:9])
+    np.testing.assert_allclose(q3, months, rtol=1e-9)
+    pd.testing.assert_frame_equal(cube.pnl(("April", "March")), cube.pnl(ALL_MONTHS), rtol=1e-9)
+
+
+# Total column of key lines, as computed from the read_excel frames before the streaming reader
+EXPECTED_TOTALS = {
+    ("2025-26", ALL_MONTHS): (32736900.66, 18375972.93, 7426654.08, 22.69),
+    ("2025-26", "May"): (9605776.39, 4649408.53, 1281653.32, 13.34),
+    ("2024-25", ALL_MONTHS): (118865539.82, 75927416.66, 38788766.32, 32.63),
+    ("2024-25", "May"): (9324938.05, 5841099.60, 2331959.20, 25.01),
+}
+
+
+@pytest.mark.parametrize("fy, month", list(EXPECTED_TOTALS))
+def test_pnl_totals(cubes, fy, month):
+    pnl = cubes[fy].pnl(month)
+    totals = pnl.loc[[SALES, GROSS_PROFIT, NET_PROFIT, NET_PROFIT_PCT], TOTAL].to_numpy()
+    assert totals == pytest.approx(EXPECTED_TOTALS[(fy, month)], abs=0.01)
+
+
+def test_every_month_adds_up_to_the_year(cubes):
+    for cube in cubes.values():
+        months = sum(cube.pnl(month).loc[SALES, TOTAL] for month in MONTHS)
+        assert months == pytest.approx(cube.pnl().loc[SALES, TOTAL])
+
+
+
+def test_only_the_edited_sheet_is_reparsed_and_recomputed(tmp_path, monkeypatch):
+    path = str(tmp_path / "book.xlsx")
+    shutil.copyfile(WORKBOOK, path)
+    sheets, versions = profitability_snapshot.load_snapshot_versions(path)
+    previous = build_cubes(sheets, versions, workers=1)
+
+    # One cached Amount value of the first TNS 25-26 row, changed inside its worksheet part
+    tns = "Expense - TNS 25-26"
+    edit_sheet(WORKBOOK, path, tns, b'si="1">F2</f><v>5883</v>', b'si="1">F2</f><v>6883</v>')
+    parsed = []
+    load_sheets = profitability_snapshot.load_sheets
+    monkeypatch.setattr(profitability_snapshot, "load_sheets",
+                        lambda path, headers, **kw: parsed.extend(headers) or load_sheets(path, headers, **kw))
+    sheets, edited = profitability_snapshot.load_snapshot_versions(path)
+    assert parsed == [tns]
+    assert [name for name in edited if edited[name] != versions[name]] == [tns]
+
+    with recording() as recorder:
+        cubes = build_cubes(sheets, edited, previous, workers=1)
+    assert [(s["stage"], s["fy"]) for s in recorder.spans] == [("tns", "2025-26")]
+    change = cubes["2025-26"].pnl().loc[TNS_EXPENSES, TOTAL] - previous["2025-26"].pnl().loc[TNS_EXPENSES, TOTAL]
+    assert change == pytest.approx(1000)
+    full = build_cubes(sheets, workers=1)
+    for fy, cube in full.items():
+        for month in [ALL_MONTHS] + MONTHS:
+            pd.testing.assert_frame_equal(cubes[fy].pnl(month), cube.pnl(month))
+
+
+def test_compare_pnl_aligns_rows_by_label():
+    index = pd.Index([SALES, "Rent", "Travel", NET_PROFIT_PCT], name="Particulars")
+    current = pd.DataFrame({TOTAL: [150.0, 20.0, 5.0, 12.0]}, index=index)
+    # "Audit" only exists in the previous year, between Rent and Travel; Travel is new
+    previous = pd.DataFrame({TOTAL: [100.0, 25.0, 8.0, 10.0]}, index=pd.Index([SALES, "Rent", "Audit", NET_PROFIT_PCT], name="Particulars"))
+    comparison = compare_pnl(current, previous, names=("FY 25-26", "FY 24-25"))
+    assert list(comparison.index) == [SALES, "Rent", "Audit", "Travel", NET_PROFIT_PCT]
+    total = comparison[TOTAL]
+    assert list(total.columns) == ["FY 25-26", "FY 24-25", CHANGE, CHANGE_PCT]
+    assert total.loc[SALES].tolist() == [150.0, 100.0, 50.0, 50.0]
+    assert total.loc["Rent", CHANGE_PCT] == pytest.approx(-20.0)
+    assert total.loc["Audit"].tolist()[:3] == [0.0, 8.0, -8.0]
+    assert total.loc["Audit", CHANGE_PCT] == pytest.approx(-100.0)
+    # A line the previous year lacks has no base to compare against
+    assert total.loc["Travel", CHANGE] == 5.0 and np.isnan(total.loc["Travel", CHANGE_PCT])
+    # Net Profit % changes in percentage points only
+    assert total.loc[NET_PROFIT_PCT, CHANGE] == pytest.approx(2.0) and np.isnan(total.loc[NET_PROFIT_PCT, CHANGE_PCT])
@@ -0,0 +1,34 @@
+import pandas as pd
+import pytest
+
+from conftest import WORKBOOK
+from profitability_loader import SHEET_LAYOUTS, normalize_periods, range_bounds, sheet_headers, sheet_layout, workbook_sheet_names
+
+
+def _read_excel_block(name):
+    # What read_excel gives for the sheet, clipped to its SHEET_LAYOUTS block
+    header, cell_range = sheet_layout(name)
+    df = pd.read_excel(WORKBOOK, sheet_name=name, header=header, engine="openpyxl")
+    max_row, max_col = range_bounds(cell_range)
+    if max_col is not None:
+        df = df.iloc[:, :max_col]
+    if max_row is not None:
+        df = df.iloc[:max_row - (header + 1 if header is not None else 0)]
+    return normalize_periods(df)
+
+
+def _trim(df):
+    # Formatted but empty rows at the bottom: read_excel keeps them, the streaming reader does not
+    filled = df.notna().any(axis=1).to_numpy()
+    last = filled.nonzero()[0].max() + 1 if filled.any() else 0
+    return df.iloc[:last]
+
+
+def test_registry_covers_every_loaded_sheet(sheets):
+    assert set(sheets) >= {"Sales"} | {t.format(fy=fy) for t in SHEET_LAYOUTS if "{fy}" in t for fy in ("25-26", "24-25")}
+
+
+@pytest.mark.parametrize("name", list(sheet_headers(workbook_sheet_names(WORKBOOK))))
+def test_load_sheets_matches_read_excel(sheets, name):
+    expected = _trim(_read_excel_block(name))
+    pd.testing.assert_frame_equal(_trim(sheets[name]), expected, check_dtype=False)
@@ -0,0 +1,26 @@
+import numpy as np
+import pandas as pd
+
+from profitability_engine import NET_PROFIT_PCT, SALES, TOTAL
+from profitability_render import format_indian, format_percent, format_pnl_table
+
+
+def test_format_indian_groups_in_lakhs_and_crores():
+    values = [0, 999, 1000, 123456, 12345678, 1234567890]
+    assert format_indian(values).tolist() == ["0", "999", "1,000", "1,23,456", "1,23,45,678", "1,23,45,67,890"]
+
+
+def test_format_indian_edge_cases():
+    assert format_indian([-1234567.4, -0.4, 999.5, 999.4, np.nan]).tolist() == ["-12,34,567", "0", "1,000", "999", ""]
+    assert format_indian([[1000, -50], [np.nan, 7]]).shape == (2, 2)
+
+
+def test_format_percent_edge_cases():
+    assert format_percent([22.689, -3.456, 0, np.nan]).tolist() == ["22.69%", "-3.46%", "0.00%", ""]
+
+
+def test_pnl_table_formats_only_the_percent_row_as_percent():
+    pnl = pd.DataFrame({TOTAL: [1234567.0, 12.345]}, index=[SALES, NET_PROFIT_PCT])
+    table = format_pnl_table(pnl)
+    assert table["Particulars"].tolist() == [SALES, NET_PROFIT_PCT]
+    assert table[TOTAL].tolist() == ["12,34,567", "12.35%"]
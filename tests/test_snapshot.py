@@ -0,0 +1,40 @@
+import datetime
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from conftest import WORKBOOK
+from profitability_snapshot import load_snapshot_versions, read_manifest, read_snapshot, write_snapshot
+
+
+def test_mixed_columns_round_trip(tmp_path):
+    when = datetime.datetime(2025, 5, 2)
+    df = pd.DataFrame({
+        "Head": ["Rent", np.nan, "Audit", "Travel"],
+        "Mixed": ["Total", 12, 3.5, when],
+        "Flags": [True, "n/a", np.nan, 7],
+        "Amount": [1.5, np.nan, -2.0, 0.0],
+        "Count": np.array([1, 2, 3, 4], dtype=np.int64),
+        when: pd.to_datetime(["2025-04-01", None, "2025-06-01", "2025-07-01"]),
+        7: [np.nan, np.nan, np.nan, np.nan],
+    })
+    path = str(tmp_path / "book.xlsx")
+    manifest = write_snapshot(path, {"Sales": df}, fingerprints={}, source={"mtime_ns": 0, "size": 0})
+    assert manifest == read_manifest(path)
+    back = read_snapshot(manifest, path)["Sales"]
+    pd.testing.assert_frame_equal(back, df)
+    # Each mixed cell comes back as the Python type it was stored as
+    assert [type(v) for v in back["Mixed"]] == [str, int, float, datetime.datetime]
+    assert [type(v) for v in back["Flags"][[0, 1, 3]]] == [bool, str, int]
+
+
+def test_snapshot_serves_the_parsed_sheets(tmp_path, sheets):
+    path = str(tmp_path / "book.xlsx")
+    shutil.copyfile(WORKBOOK, path)
+    written, versions = load_snapshot_versions(path)
+    mapped, mapped_versions = load_snapshot_versions(path)
+    assert mapped_versions == versions and list(mapped) == list(sheets)
+    for name, df in sheets.items():
+        pd.testing.assert_frame_equal(written[name], df)
+        pd.testing.assert_frame_equal(mapped[name], df)
@@ -0,0 +1,61 @@
+import shutil
+
+import pandas as pd
+import pytest
+
+from conftest import WORKBOOK, edit_sheet
+from profitability_engine import ALL_MONTHS, MONTHS, TNS_EXPENSES, build_cube, fiscal_periods
+from profitability_loader import load_sheets
+from profitability_store import append, connect, ingest, load_cube, query_pnl, stored_fiscal_years
+
+
+@pytest.fixture(scope="module")
+def store(tmp_path_factory):
+    path = ingest(WORKBOOK, str(tmp_path_factory.mktemp("store") / "profitability.sqlite"))
+    conn = connect(path)
+    yield path, conn
+    conn.close()
+
+
+def test_store_holds_every_fiscal_year(store, cubes):
+    assert stored_fiscal_years(store[1]) == list(cubes)
+
+
+def test_load_cube_matches_build_cube(store, cubes):
+    for fy, expected in cubes.items():
+        cube = load_cube(store[1], fy)
+        assert cube.expense_heads == expected.expense_heads
+        assert cube.warnings == expected.warnings
+        for month in [ALL_MONTHS] + MONTHS:
+            pd.testing.assert_frame_equal(cube.pnl(month), expected.pnl(month), rtol=1e-9, atol=1e-6)
+
+
+def test_query_pnl_matches_cube_ranges(store, cubes):
+    for fy, cube in cubes.items():
+        periods = fiscal_periods(fy)
+        pd.testing.assert_frame_equal(query_pnl(store[1], fy), cube.pnl(), rtol=1e-9, atol=1e-6)
+        pd.testing.assert_frame_equal(query_pnl(store[1], fy, periods[3], periods[8]), cube.pnl(("July", "December")),
+                                      rtol=1e-9, atol=1e-5)
+
+
+
+def test_append_without_changes_writes_nothing(store):
+    assert append(WORKBOOK, store[0]) == {}
+
+
+def test_append_rewrites_only_the_edited_period(tmp_path):
+    path = str(tmp_path / "book.xlsx")
+    shutil.copyfile(WORKBOOK, path)
+    store = ingest(path, str(tmp_path / "profitability.sqlite"))
+    # Amount of a TNS 25-26 row dated 2 May 2025
+    edit_sheet(WORKBOOK, path, "Expense - TNS 25-26", b'si="1">F2</f><v>5883</v>', b'si="1">F2</f><v>6883</v>')
+    assert append(path, store) == {("2025-26", TNS_EXPENSES): [202505]}
+    sheets = load_sheets(path, workers=1)
+    conn = connect(store)
+    try:
+        for fy in stored_fiscal_years(conn):
+            cube, expected = load_cube(conn, fy), build_cube(sheets, fy)
+            for month in [ALL_MONTHS] + MONTHS:
+                pd.testing.assert_frame_equal(cube.pnl(month), expected.pnl(month), rtol=1e-9, atol=1e-6)
+    finally:
+        conn.close()
@@ -0,0 +1,27 @@
+import threading
+import time
+
+import profitability_watcher
+from profitability_watcher import WarmState, WorkbookWatcher
+
+
+def test_take_bytes_read_does_not_wait_for_a_rebuild(tmp_path, monkeypatch):
+    path = tmp_path / "book.xlsx"
+    path.write_bytes(b"v1")
+    started = threading.Event()
+
+    def slow_build(path, previous=None):
+        started.set()
+        time.sleep(1.0)
+        return WarmState(source=profitability_watcher._source(path), fingerprint="", sheets={}, versions={},
+                         cubes={}, pnls={}, build_ms=0.0)
+
+    monkeypatch.setattr(profitability_watcher, "build_state", slow_build)
+    watcher = WorkbookWatcher(str(path))
+    rebuild = threading.Thread(target=watcher._refresh, kwargs={"report": False})
+    rebuild.start()
+    assert started.wait(5)
+    began = time.monotonic()
+    assert watcher.take_bytes_read() == 0
+    assert time.monotonic() - began < 0.5
+    rebuild.join()